@@ -0,0 +1,131 @@
+"""Batch position analysis.
+
+Reads one position per line, written in the notation of notation.py, from a file or stdin.
+Each position is analysed by the normal or hard CPU in a pool of worker processes, and one
+JSON line per position is written in input order:
+
+    python analyze.py positions.txt --engine hard --time-limit 0.5 --workers 4 > analysis.jsonl
+    cat positions.txt | python analyze.py - --engine hard --depth 5
+
+Every record holds the input line number, the position, the best move, its score from the
+side to move's point of view, the completed depth, the nodes searched and the seconds taken.
+A line that cannot be parsed gets an "error" record instead. Blank lines and lines starting
+with '#' are skipped.
+
+Input is read lazily, and at most IN_FLIGHT_PER_WORKER positions per worker are read ahead
+of the output, so memory use stays flat however long the input is. A result is written as
+soon as it and every result before it are done.
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Optional, TextIO
+from bitboard import DEFAULT_RULES, Rules
+from cpu_ai import NORMAL_DEPTH, SearchStats, ai_best_move_hard, ai_best_move_normal
+from notation import parse_notation
+
+IN_FLIGHT_PER_WORKER = 4  # Positions submitted ahead of the output, per worker
+
+
+@lru_cache(maxsize=None)
+def rules_for(size: int, line_length: int) -> Rules:
+    """The rules of a board size and line length, built once per worker process."""
+    if (size, line_length) == (DEFAULT_RULES.size, DEFAULT_RULES.line_length):
+        return DEFAULT_RULES
+    return Rules(size, line_length)
+
+
+def analyse_position(line: int, text: str, engine: str, depth: Optional[int], time_limit: Optional[float],
+                     line_length: int, use_book: bool, use_solver: bool) -> dict:
+    """Runs in a pool worker: analyses one position and returns its result record."""
+    try:
+        table, player = parse_notation(text)
+        rules = rules_for(len(table), line_length)
+    except ValueError as error:
+        return {"line": line, "position": text, "error": str(error)}
+
+    stats, start = SearchStats(), time.perf_counter()
+    if engine == "normal":
+        move = ai_best_move_normal(table, player, stats=stats, rules=rules, depth=depth or NORMAL_DEPTH)
+    else:
+        move = ai_best_move_hard(table, player, time_limit=time_limit, stats=stats, use_book=use_book,
+                                 use_solver=use_solver, rules=rules, depth=depth)
+    seconds = time.perf_counter() - start
+    score = stats.score
+    return {
+        "line": line,
+        "position": text,
+        "best_move": move or None,
+        # A side left without moves scores infinity, which JSON cannot hold
+        "score": score if score is None or math.isfinite(score) else None,
+        "depth": stats.completed_depth,
+        "nodes": stats.nodes,
+        "seconds": round(seconds, 6),
+    }
+
+
+def analyse_stream(lines: Iterable[str], output: TextIO, workers: Optional[int], **options) -> dict:
+    """Analyses every position of `lines`, writing result records to `output` in input order.
+
+    `options` are the engine arguments of analyse_position. Returns a summary of the run.
+    """
+    workers = workers or os.cpu_count() or 1
+    pending, written, errors, start = deque(), 0, 0, time.perf_counter()
+
+    def write_next() -> None:
+        nonlocal written, errors
+        result = pending.popleft().result()
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        written += 1
+        errors += "error" in result
+
+    with ProcessPoolExecutor(workers) as executor:
+        for number, line in enumerate(lines, start=1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            pending.append(executor.submit(analyse_position, number, text, **options))
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                write_next()
+        while pending:
+            write_next()
+    elapsed = time.perf_counter() - start
+    return {"positions": written, "errors": errors, "seconds": round(elapsed, 3),
+            "positions_per_second": round(written / elapsed, 3) if elapsed else 0.0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyse positions in bulk and stream the results as JSONL")
+    parser.add_argument("input", nargs="?", default="-", help='file of positions, one per line ("-" for stdin)')
+    parser.add_argument("--engine", choices=("normal", "hard"), default="hard")
+    parser.add_argument("--depth", type=int, default=None,
+                        help=f"search depth (normal: {NORMAL_DEPTH}; hard: its usual depth, or unlimited with a time limit)")
+    parser.add_argument("--time-limit", type=float, default=None, help="seconds per position (hard engine only)")
+    parser.add_argument("--line-length", type=int, default=DEFAULT_RULES.line_length, help="pieces in a row that win")
+    parser.add_argument("--no-book", action="store_true", help="do not answer from the opening book")
+    parser.add_argument("--no-solver", action="store_true", help="do not run the threat solver first")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--output", default="-", help='JSONL results file ("-" for stdout)')
+    args = parser.parse_args()
+    if args.time_limit is not None and args.engine != "hard":
+        parser.error("--time-limit needs --engine hard")
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        summary = analyse_stream(source, output, args.workers, engine=args.engine, depth=args.depth,
+                                 time_limit=args.time_limit, line_length=args.line_length,
+                                 use_book=not args.no_book, use_solver=not args.no_solver)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,104 @@
+"""Vectorised hard-mode evaluation of many boards at once (requires NumPy).
+
+`evaluate_boards_hard` scores a stack of boards with array operations and returns exactly what
+`cpu_ai.evaluate_board_hard` returns for each of them. `evaluate_bitboards_hard` has the
+signature `minimax_hard` expects for its `batch_evaluator`, so the search can score the whole
+last ply of a node with one call:
+
+    ai_best_move_hard(table, player, batch_evaluator=evaluate_bitboards_hard)
+
+Run this module to check the vectorised scores against the scalar evaluator.
+"""
+import random
+import sys
+import numpy as np
+from bitboard import NUM_SQUARES, from_table
+from cpu_ai import WEIGHTS, evaluate_board_hard
+from utils import TABLE_SIZE, create_initial_table
+
+_SQUARE_SHIFTS = np.arange(NUM_SQUARES, dtype=np.uint64)
+
+
+def boards_from_bitboards(greens: list[int], reds: list[int]) -> np.ndarray:
+    """Stacks bitboard pairs into an (N, TABLE_SIZE, TABLE_SIZE) int8 array of 0/1/2 cells."""
+    green_bits = (np.array(greens, dtype=np.uint64)[:, None] >> _SQUARE_SHIFTS) & np.uint64(1)
+    red_bits = (np.array(reds, dtype=np.uint64)[:, None] >> _SQUARE_SHIFTS) & np.uint64(1)
+    cells = green_bits.astype(np.int8) + 2 * red_bits.astype(np.int8)
+    return cells.reshape(-1, TABLE_SIZE, TABLE_SIZE)
+
+
+def _window_counts(pieces: np.ndarray) -> np.ndarray:
+    """Counts pieces in every horizontal and vertical 4-cell window: shape (N, windows)."""
+    horizontal = [pieces[:, :, col:col + 4].sum(axis=2) for col in range(TABLE_SIZE - 3)]
+    vertical = [pieces[:, row:row + 4, :].sum(axis=1) for row in range(TABLE_SIZE - 3)]
+    return np.concatenate(horizontal + vertical, axis=1)
+
+
+def _movable(pieces: np.ndarray, empty: np.ndarray) -> np.ndarray:
+    """Counts, per board, the pieces that have at least one empty neighbour."""
+    empty_neighbor = np.zeros_like(empty)
+    empty_neighbor[:, 1:, :] |= empty[:, :-1, :]   # Square above is empty
+    empty_neighbor[:, :-1, :] |= empty[:, 1:, :]   # Square below is empty
+    empty_neighbor[:, :, 1:] |= empty[:, :, :-1]   # Square to the left is empty
+    empty_neighbor[:, :, :-1] |= empty[:, :, 1:]   # Square to the right is empty
+    return (pieces & empty_neighbor).sum(axis=(1, 2))
+
+
+def evaluate_boards_hard(boards: np.ndarray, player: int) -> np.ndarray:
+    """Scores a stack of boards of shape (N, TABLE_SIZE, TABLE_SIZE) for `player`.
+
+    Returns an int64 vector equal to `evaluate_board_hard` applied to each board.
+    """
+    mine, theirs, empty = boards == player, boards == 3 - player, boards == 0
+    mine_counts = _window_counts(mine.astype(np.int8))
+    theirs_counts = _window_counts(theirs.astype(np.int8))
+
+    # Patterns only count in windows the other player is absent from
+    mine_free, theirs_free = theirs_counts == 0, mine_counts == 0
+    threes = ((mine_counts == 3) & mine_free).sum(axis=1) - ((theirs_counts == 3) & theirs_free).sum(axis=1)
+    twos = ((mine_counts == 2) & mine_free).sum(axis=1) - ((theirs_counts == 2) & theirs_free).sum(axis=1)
+
+    center = mine[:, 2:4, 2:4].sum(axis=(1, 2))
+    mobility = _movable(mine, empty) - _movable(theirs, empty)
+
+    scores = (threes * WEIGHTS['three_in_row'] + twos * WEIGHTS['two_in_row']
+              + center * WEIGHTS['center_control'] + mobility * WEIGHTS['mobility']).astype(np.int64)
+
+    # Check for immediate wins
+    scores = np.where((theirs_counts == 4).any(axis=1), -WEIGHTS['win'], scores)
+    scores = np.where((mine_counts == 4).any(axis=1), WEIGHTS['win'], scores)
+    return scores
+
+
+def evaluate_bitboards_hard(greens: list[int], reds: list[int], player: int) -> list[int]:
+    """Batch evaluator for `minimax_hard`: scores bitboard pairs for `player`."""
+    return evaluate_boards_hard(boards_from_bitboards(greens, reds), player).tolist()
+
+
+def verify_against_scalar(samples: int = 2000, seed: int = 0) -> bool:
+    """Checks the vectorised scores against `evaluate_board_hard` on random game positions."""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(samples):
+        position, player = from_table(create_initial_table()), rng.choice((1, 2))
+        for _ in range(rng.randrange(40)):
+            moves = position.moves(player)
+            if not moves or position.winner():
+                break
+            position.make_move(rng.choice(moves), player)
+            player = 3 - player
+        positions.append(position)
+
+    greens = [position.boards[1] for position in positions]
+    reds = [position.boards[2] for position in positions]
+    for player in (1, 2):
+        expected = [evaluate_board_hard(position, player) for position in positions]
+        if evaluate_bitboards_hard(greens, reds, player) != expected:
+            return False
+    return True
+
+
+if __name__ == "__main__":
+    ok = verify_against_scalar()
+    print("batch evaluation matches evaluate_board_hard" if ok else "MISMATCH with evaluate_board_hard")
+    sys.exit(0 if ok else 1)
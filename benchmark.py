@@ -0,0 +1,218 @@
+"""Benchmarks and perft for move generation, evaluation and search.
+
+Runs every benchmark on a fixed corpus of positions and prints the results as JSON:
+
+    python benchmark.py --save baseline.json     # store a run
+    python benchmark.py --baseline baseline.json # compare a new run against it
+
+The perft counters report the number of leaf positions at a given depth, which must not change
+when the move generator is optimised. `--check` verifies the bitboard generator against the
+list-based one in utils, and the NumPy batch evaluator (when available) against the scalar one.
+
+The "board_sizes" section runs the hard search for a fixed time from the starting position of
+larger variants (see bitboard.Rules) and reports nodes per second, which shows how the engine
+scales with the board:
+
+    python benchmark.py --sizes 6 8 10 --line-length 4
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Callable
+from bitboard import Position, Rules, from_table
+from cpu_ai import SearchStats, ai_best_move_hard, ai_best_move_normal, evaluate_board_hard, evaluate_board_normal
+from utils import check_winner, create_initial_table, get_available_squares, make_move, move_piece, unmake_move
+
+try:
+    import batch_eval
+except ImportError:  # NumPy is optional; the batch benchmarks are skipped without it
+    batch_eval = None
+
+# Fixed corpus of (name, table, player to move)
+CORPUS: tuple = (
+    ("opening", create_initial_table(), 1),
+    ("middle", [
+        [0, 0, 0, 1, 0, 0],
+        [1, 0, 2, 0, 0, 2],
+        [2, 0, 0, 0, 1, 0],
+        [1, 0, 0, 0, 2, 0],
+        [2, 0, 1, 2, 0, 0],
+        [0, 0, 0, 0, 0, 1],
+    ], 1),
+    ("near_win", [
+        [0, 0, 2, 1, 0, 2],
+        [1, 1, 1, 0, 0, 0],
+        [2, 0, 0, 2, 0, 1],
+        [0, 0, 0, 0, 0, 0],
+        [0, 0, 0, 0, 0, 0],
+        [2, 0, 1, 0, 0, 2],
+    ], 1),
+)
+
+PERFT_DEPTH = 4
+BATCH_SIZE = 1024  # Boards per call in the batch evaluation benchmark
+MIN_SECONDS = 0.2  # Each benchmark repeats its call until at least this much time has passed
+BOARD_SIZES = (6, 8, 10)
+SIZE_SEARCH_SECONDS = 1.0  # Search time per board size
+SIZE_PERFT_DEPTH = 3
+
+
+def perft(position: Position, player: int, depth: int) -> int:
+    """Counts the leaf positions reached after `depth` plies; won positions have no moves."""
+    if depth == 0:
+        return 1
+    if position.winner():
+        return 0
+    leaves = 0
+    for move in position.moves(player):
+        undo = position.make_move(move, player)
+        leaves += perft(position, 3 - player, depth - 1)
+        position.unmake_move(undo, player)
+    return leaves
+
+
+def perft_table(table: list[list[int]], player: int, depth: int) -> int:
+    """Same count as `perft`, using the list-based move generator in utils."""
+    if depth == 0:
+        return 1
+    if check_winner(table):
+        return 0
+    leaves = 0
+    for square in get_available_squares(table, player):
+        for direction in square['available_moves']:
+            undo = make_move(table, square['square_position'], direction, player)
+            leaves += perft_table(table, 3 - player, depth - 1)
+            unmake_move(table, undo)
+    return leaves
+
+
+def time_call(function: Callable[[], object]) -> dict:
+    """Calls `function` repeatedly for at least MIN_SECONDS and reports the time per call."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        function()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return {"calls": calls, "seconds_per_call": elapsed / calls}
+
+
+def run_benchmarks(perft_depth: int) -> dict:
+    """Runs every benchmark on every corpus position and returns the results."""
+    results, search_stats = {}, {}
+    for name, table, player in CORPUS:
+        position = from_table(table)
+        square = get_available_squares(table, player)[0]
+        benchmarks = {
+            "get_available_squares": lambda: get_available_squares(table, player),
+            "move_piece": lambda: move_piece([row[:] for row in table], square['square_position'],
+                                             square['available_moves'][0], player),
+            "check_winner": lambda: check_winner(table),
+            "position_moves": lambda: position.moves(player),
+            "evaluate_board_normal": lambda: evaluate_board_normal(position, player),
+            "evaluate_board_hard": lambda: evaluate_board_hard(position, player),
+            "ai_best_move_normal": lambda: ai_best_move_normal(table, player),
+            "ai_best_move_hard": lambda: ai_best_move_hard(table, player),
+        }
+        if batch_eval is not None:
+            boards = batch_eval.boards_from_bitboards([position.boards[1]] * BATCH_SIZE, [position.boards[2]] * BATCH_SIZE)
+            benchmarks[f"evaluate_boards_hard_x{BATCH_SIZE}"] = lambda: batch_eval.evaluate_boards_hard(boards, player)
+        for benchmark, function in benchmarks.items():
+            results[f"{name}/{benchmark}"] = time_call(function)
+
+        start = time.perf_counter()
+        leaves = perft(position, player, perft_depth)
+        elapsed = time.perf_counter() - start
+        results[f"{name}/perft"] = {"depth": perft_depth, "leaves": leaves, "seconds": elapsed,
+                                    "leaves_per_second": leaves / elapsed if elapsed else 0.0}
+
+        # Node counts and cutoff rates show how well the hard search orders its moves
+        stats = SearchStats()
+        ai_best_move_hard(table, player, stats=stats, use_book=False, use_solver=False)
+        search_stats[name] = stats.as_dict()
+    return {"python": platform.python_version(), "results": results, "search_stats": search_stats}
+
+
+def run_size_benchmarks(sizes: tuple, line_length: int, seconds: float = SIZE_SEARCH_SECONDS) -> dict:
+    """Measures search and move generation speed from the starting position of each board size."""
+    results = {}
+    for size in sizes:
+        rules = Rules(size, line_length)
+        table = rules.initial_table()
+        stats = SearchStats()
+        start = time.perf_counter()
+        ai_best_move_hard(table, 1, time_limit=seconds, stats=stats, use_book=False, use_solver=False, rules=rules)
+        elapsed = time.perf_counter() - start
+
+        perft_start = time.perf_counter()
+        leaves = perft(rules.initial_position(), 1, SIZE_PERFT_DEPTH)
+        perft_elapsed = time.perf_counter() - perft_start
+        results[f"{size}x{size}"] = {
+            "line_length": line_length,
+            "windows": len(rules.windows),
+            "nodes": stats.nodes,
+            "completed_depth": stats.completed_depth,
+            "nodes_per_second": round(stats.nodes / elapsed) if elapsed else 0,
+            "perft_depth": SIZE_PERFT_DEPTH,
+            "perft_leaves_per_second": round(leaves / perft_elapsed) if perft_elapsed else 0,
+        }
+    return results
+
+
+def check_perft(depth: int) -> bool:
+    """Compares bitboard and list-based perft counts for every corpus position."""
+    ok = True
+    for name, table, player in CORPUS:
+        expected = perft_table([row[:] for row in table], player, depth)
+        actual = perft(from_table(table), player, depth)
+        print(f"{name}: table {expected}, bitboard {actual}{'' if expected == actual else '  MISMATCH'}")
+        ok = ok and expected == actual
+    if batch_eval is not None:
+        batch_ok = batch_eval.verify_against_scalar()
+        print(f"batch evaluation: {'matches' if batch_ok else 'MISMATCH with'} evaluate_board_hard")
+        ok = ok and batch_ok
+    return ok
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Returns, per benchmark, how many times slower (>1) or faster (<1) the current run is."""
+    ratios = {}
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name)
+        if previous is None:
+            continue
+        if "seconds_per_call" in result:
+            ratios[name] = result["seconds_per_call"] / previous["seconds_per_call"]
+        elif result["leaves"] != previous["leaves"]:
+            ratios[name] = f"leaf count changed: {previous['leaves']} -> {result['leaves']}"
+        else:
+            ratios[name] = result["seconds"] / previous["seconds"]
+    return ratios
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark move generation, evaluation and search")
+    parser.add_argument("--perft-depth", type=int, default=PERFT_DEPTH)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results stored in this JSON file")
+    parser.add_argument("--check", action="store_true", help="only verify perft (and batch evaluation) against the reference code")
+    parser.add_argument("--sizes", type=int, nargs="*", default=BOARD_SIZES, help="board sizes for the scaling benchmark")
+    parser.add_argument("--line-length", type=int, default=4, help="pieces in a row that win, for the scaling benchmark")
+    args = parser.parse_args()
+    if any(size < 4 or size % 2 or not 3 <= args.line_length <= size for size in args.sizes):
+        parser.error("--sizes must be even and at least 4, and --line-length between 3 and every size")
+
+    if args.check:
+        sys.exit(0 if check_perft(args.perft_depth) else 1)
+
+    report = run_benchmarks(args.perft_depth)
+    report["board_sizes"] = run_size_benchmarks(tuple(args.sizes), args.line_length)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            report["relative_to_baseline"] = compare(report, json.load(file))
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,410 @@
+import random
+from typing import Callable, List, Dict, Optional
+from utils import LINE_LENGTH, TABLE_SIZE, initial_layout
+
+# Same order as utils.get_available_moves: up, down, left, right
+DIRECTIONS: tuple = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# Zobrist keys are drawn from a fixed seed, which keeps hashes stable between runs so they
+# can be stored on disk.
+ZOBRIST_SEED: int = 0x6372616B
+
+
+def _line_finder(size: int, line_length: int, horizontal_starts: int, vertical_starts: int) -> Callable[[int], bool]:
+    """Builds the check for `line_length` pieces in a row on one board size."""
+    if line_length == 4:  # The standard game, unrolled
+        def has_line(board: int) -> bool:
+            """Checks whether a single player's board contains four in a row."""
+            horizontal = board & (board >> 1) & (board >> 2) & (board >> 3) & horizontal_starts
+            vertical = board & (board >> size) & (board >> 2 * size) & (board >> 3 * size) & vertical_starts
+            return bool(horizontal or vertical)
+        return has_line
+
+    shifts = range(1, line_length)
+
+    def has_line(board: int) -> bool:
+        """Checks whether a single player's board contains a full line."""
+        horizontal, vertical = board & horizontal_starts, board & vertical_starts
+        for shift in shifts:
+            horizontal &= board >> shift
+            vertical &= board >> shift * size
+        return bool(horizontal or vertical)
+    return has_line
+
+
+class Rules:
+    """A game variant: board size, pieces in a row needed to win and starting layout.
+
+    All the tables the bitboard code needs are precomputed here once per variant. Square index
+    is row * size + col; bit N of a board is set when square N holds a piece.
+
+    Pattern counting works on every window of `line_length` cells in a row or column. A
+    window's state is `green_count + (line_length + 1) * red_count`, and `window_tally` maps
+    it to packed pattern counters: per player, full lines ("fours"), windows one piece short
+    with the rest empty ("threes") and windows two pieces short ("twos"). Every square lies in
+    at most 2 * line_length windows, so keeping the counts up to date costs the same on any
+    board size.
+    """
+
+    __slots__ = ("size", "line_length", "layout", "num_squares", "full_mask", "move_codes", "steps",
+                 "col_first_mask", "col_last_mask", "horizontal_starts", "vertical_starts",
+                 "horizontal_windows", "vertical_windows", "windows", "windows_by_square",
+                 "horizontal_by_square", "vertical_by_square", "window_units",
+                 "tally_shifts", "fours_shift", "threes_shift", "twos_shift", "tally_mask", "window_tally",
+                 "center_mask", "neighbors", "rays", "ray_ends", "zobrist", "side_keys", "has_line")
+
+    def __init__(self, size: int = TABLE_SIZE, line_length: int = LINE_LENGTH,
+                 layout: Optional[List[tuple[int, int, int]]] = None) -> None:
+        if not 3 <= line_length <= size:
+            raise ValueError("line_length must be between 3 and the board size")
+        self.size = size
+        self.line_length = line_length
+        self.layout = tuple(layout if layout is not None else initial_layout(size))
+        squares = {(row, col) for row, col, _ in self.layout}
+        players = [player for _, _, player in self.layout]
+        if (len(squares) != len(self.layout) or not all(0 <= row < size and 0 <= col < size for row, col in squares)
+                or not set(players) <= {1, 2} or players.count(1) != players.count(2)):
+            raise ValueError("layout must give both players as many pieces, on distinct squares of the board")
+        self.num_squares = size * size
+        self.full_mask = (1 << self.num_squares) - 1
+        self.move_codes = self.num_squares * len(DIRECTIONS)
+        self.steps = tuple(dr * size + dc for dr, dc in DIRECTIONS)
+        self.col_first_mask = sum(1 << (row * size) for row in range(size))
+        self.col_last_mask = self.col_first_mask << (size - 1)
+
+        # Squares where a horizontal/vertical line may start
+        span = size - line_length + 1
+        self.horizontal_starts = sum(1 << (row * size + col) for row in range(size) for col in range(span))
+        self.vertical_starts = sum(1 << (row * size + col) for row in range(span) for col in range(size))
+
+        # Every window, horizontal ones first (row by row), then vertical ones (column by column)
+        self.horizontal_windows = tuple(sum(1 << (row * size + col + k) for k in range(line_length))
+                                        for row in range(size) for col in range(span))
+        self.vertical_windows = tuple(sum(1 << ((row + k) * size + col) for k in range(line_length))
+                                      for col in range(size) for row in range(span))
+        self.windows = self.horizontal_windows + self.vertical_windows
+        self.windows_by_square = tuple(
+            tuple(index for index, window in enumerate(self.windows) if window >> square & 1)
+            for square in range(self.num_squares)
+        )
+        # The same split by orientation, horizontal windows being the first indices
+        count = len(self.horizontal_windows)
+        self.horizontal_by_square = tuple(tuple(i for i in indices if i < count) for indices in self.windows_by_square)
+        self.vertical_by_square = tuple(tuple(i for i in indices if i >= count) for indices in self.windows_by_square)
+        self.window_units = (0, 1, line_length + 1)  # One piece of each player in a window state
+
+        # Six counters packed into one int so that a window update is a single addition;
+        # 8 bits each unless the board has more windows than that can count.
+        width = max(8, len(self.windows).bit_length())
+        self.fours_shift, self.threes_shift, self.twos_shift = 0, width, 2 * width
+        self.tally_shifts = (0, 0, 3 * width)  # Bit offset of each player's fields
+        self.tally_mask = (1 << width) - 1
+        base = line_length + 1
+        self.window_tally = tuple(self._window_tally(state % base, state // base)
+                                  if state % base + state // base <= line_length else 0
+                                  for state in range(base * base))
+
+        middle = range((size - 1) // 2, size // 2 + 1)
+        self.center_mask = sum(1 << (row * size + col) for row in middle for col in middle)
+        self.neighbors, self.rays, self.ray_ends = self._build_rays()
+
+        # One random 64-bit number per (player, square), plus one for "player 2 to move"
+        rng = random.Random(ZOBRIST_SEED)
+        self.zobrist = ((0,) * self.num_squares,) + tuple(
+            tuple(rng.getrandbits(64) for _ in range(self.num_squares)) for _ in (1, 2)
+        )
+        self.side_keys = (0, 0, rng.getrandbits(64))
+        self.has_line = _line_finder(size, line_length, self.horizontal_starts, self.vertical_starts)
+
+    def __repr__(self) -> str:
+        return f"Rules(size={self.size}, line_length={self.line_length})"
+
+    def __reduce__(self) -> tuple:
+        # The tables are rebuilt on unpickling, e.g. in worker processes
+        return Rules, (self.size, self.line_length, list(self.layout))
+
+    def unpack_tally(self, tally: int, player: int) -> tuple[int, int, int]:
+        """Returns the full lines, threes and twos of `player` counted in a packed tally."""
+        fields, mask = tally >> self.tally_shifts[player], self.tally_mask
+        return (fields >> self.fours_shift) & mask, (fields >> self.threes_shift) & mask, (fields >> self.twos_shift) & mask
+
+    def _window_tally(self, green: int, red: int) -> int:
+        """Packs the patterns formed by one window with the given piece counts."""
+        tally, full = 0, self.line_length
+        for player, own, other in ((1, green, red), (2, red, green)):
+            if own == full:
+                tally += 1 << (self.tally_shifts[player] + self.fours_shift)
+            elif own == full - 1 and other == 0:
+                tally += 1 << (self.tally_shifts[player] + self.threes_shift)
+            elif own == full - 2 and other == 0:
+                tally += 1 << (self.tally_shifts[player] + self.twos_shift)
+        return tally
+
+    def _build_rays(self) -> tuple:
+        """Precomputes, for every square and direction, the neighbour bit, the ray mask and the ray's last square."""
+        size = self.size
+        neighbors, rays, ray_ends = [], [], []
+        for square in range(self.num_squares):
+            row, col = divmod(square, size)
+            square_neighbors, square_rays, square_ends = [], [], []
+            for dr, dc in DIRECTIONS:
+                mask, end = 0, square
+                r, c = row + dr, col + dc
+                while 0 <= r < size and 0 <= c < size:
+                    end = r * size + c
+                    mask |= 1 << end
+                    r, c = r + dr, c + dc
+                square_neighbors.append(1 << (square + dr * size + dc) if mask else 0)
+                square_rays.append(mask)
+                square_ends.append(end)
+            neighbors.append(tuple(square_neighbors))
+            rays.append(tuple(square_rays))
+            ray_ends.append(tuple(square_ends))
+        return tuple(neighbors), tuple(rays), tuple(ray_ends)
+
+    def movable_pieces(self, board: int, empty: int) -> int:
+        """Returns the mask of pieces on `board` that have at least one empty neighbour."""
+        size = self.size
+        return board & (
+            (empty << size)
+            | (empty >> size)
+            | ((empty << 1) & ~self.col_first_mask)
+            | ((empty >> 1) & ~self.col_last_mask)
+        )
+
+    def compute_hash(self, green: int, red: int) -> int:
+        """Computes the Zobrist hash of a piece placement from scratch."""
+        value = 0
+        for player, board in ((1, green), (2, red)):
+            while board:
+                bit = board & -board
+                value ^= self.zobrist[player][bit.bit_length() - 1]
+                board ^= bit
+        return value
+
+    def initial_table(self) -> List[List[int]]:
+        """Returns the list-of-lists game table of the starting layout."""
+        table = [[0 for _ in range(self.size)] for _ in range(self.size)]
+        for row, col, player in self.layout:
+            table[row][col] = player
+        return table
+
+    def initial_position(self) -> "Position":
+        """Returns the starting position."""
+        return from_table(self.initial_table(), self)
+
+
+# The standard game: 6x6, four in a row. The module-level names below are its tables.
+DEFAULT_RULES = Rules()
+
+NUM_SQUARES: int = DEFAULT_RULES.num_squares
+FULL_MASK: int = DEFAULT_RULES.full_mask
+STEPS: tuple = DEFAULT_RULES.steps
+COL_FIRST_MASK: int = DEFAULT_RULES.col_first_mask
+COL_LAST_MASK: int = DEFAULT_RULES.col_last_mask
+HORIZONTAL_STARTS: int = DEFAULT_RULES.horizontal_starts
+VERTICAL_STARTS: int = DEFAULT_RULES.vertical_starts
+HORIZONTAL_WINDOWS: tuple = DEFAULT_RULES.horizontal_windows
+VERTICAL_WINDOWS: tuple = DEFAULT_RULES.vertical_windows
+WINDOWS: tuple = DEFAULT_RULES.windows
+WINDOWS_BY_SQUARE: tuple = DEFAULT_RULES.windows_by_square
+WINDOW_UNITS: tuple = DEFAULT_RULES.window_units
+TALLY_SHIFTS: tuple = DEFAULT_RULES.tally_shifts
+FOURS_SHIFT, THREES_SHIFT, TWOS_SHIFT = DEFAULT_RULES.fours_shift, DEFAULT_RULES.threes_shift, DEFAULT_RULES.twos_shift
+WINDOW_TALLY: tuple = DEFAULT_RULES.window_tally
+CENTER_MASK: int = DEFAULT_RULES.center_mask
+NEIGHBORS, RAYS, RAY_ENDS = DEFAULT_RULES.neighbors, DEFAULT_RULES.rays, DEFAULT_RULES.ray_ends
+ZOBRIST: tuple = DEFAULT_RULES.zobrist
+SIDE_KEYS: tuple = DEFAULT_RULES.side_keys
+has_line = DEFAULT_RULES.has_line
+movable_pieces = DEFAULT_RULES.movable_pieces
+compute_hash = DEFAULT_RULES.compute_hash
+
+
+def encode_move(square: int, direction: int) -> int:
+    """Packs a piece square and a direction index into a single move code."""
+    return square << 2 | direction
+
+
+class Position:
+    """A game position stored as one bitboard per player (`boards[1]` and `boards[2]`).
+
+    `rules` is the game variant, DEFAULT_RULES unless given.
+    `hash` is the Zobrist hash of the piece placement; it does not include the side to move
+    (xor in `rules.side_keys[player]` for that).
+    `window_counts` holds the state of every window, and `horizontal_tally` and `vertical_tally`
+    the packed pattern counts over the windows of each orientation. They are kept up to date by
+    `make_move`/`unmake_move`, so the evaluators read them instead of rescanning the board.
+    """
+
+    __slots__ = ("boards", "hash", "window_counts", "horizontal_tally", "vertical_tally", "rules")
+
+    def __init__(self, green: int = 0, red: int = 0, hash: Optional[int] = None, rules: Rules = DEFAULT_RULES) -> None:
+        self.rules = rules
+        self.boards = [0, green, red]
+        self.hash = rules.compute_hash(green, red) if hash is None else hash
+        unit = rules.window_units[2]
+        self.window_counts = [(green & window).bit_count() + unit * (red & window).bit_count()
+                              for window in rules.windows]
+        count = len(rules.horizontal_windows)
+        self.horizontal_tally = sum(rules.window_tally[state] for state in self.window_counts[:count])
+        self.vertical_tally = sum(rules.window_tally[state] for state in self.window_counts[count:])
+
+    @property
+    def tally(self) -> int:
+        """Packed pattern counts over all windows."""
+        return self.horizontal_tally + self.vertical_tally
+
+    def occupied(self) -> int:
+        """Returns the mask of all occupied squares."""
+        return self.boards[1] | self.boards[2]
+
+    def piece_moves(self, player: int) -> list[tuple[int, list[int]]]:
+        """Lists every movable piece of `player` with its move codes, in board order."""
+        board = self.boards[player]
+        occupied = board | self.boards[3 - player]
+        neighbors = self.rules.neighbors
+        result = []
+        while board:
+            bit = board & -board
+            square = bit.bit_length() - 1
+            moves = [square << 2 | d for d, neighbor in enumerate(neighbors[square])
+                     if neighbor and not occupied & neighbor]
+            if moves:
+                result.append((square, moves))
+            board ^= bit
+        return result
+
+    def moves(self, player: int) -> list[int]:
+        """Lists every move code available to `player`, in board order."""
+        return [move for _, moves in self.piece_moves(player) for move in moves]
+
+    def destination(self, move: int) -> int:
+        """Returns the square where the piece moved by `move` comes to rest."""
+        square, direction = move >> 2, move & 3
+        rules = self.rules
+        blockers = rules.rays[square][direction] & (self.boards[1] | self.boards[2])
+        if not blockers:
+            return rules.ray_ends[square][direction]
+        step = rules.steps[direction]
+        if step > 0:
+            first = (blockers & -blockers).bit_length() - 1
+        else:
+            first = blockers.bit_length() - 1
+        return first - step
+
+    def copy(self) -> "Position":
+        """Returns an independent copy of this position."""
+        position = Position.__new__(Position)
+        position.boards = self.boards[:]
+        position.hash = self.hash
+        position.window_counts = self.window_counts[:]
+        position.horizontal_tally = self.horizontal_tally
+        position.vertical_tally = self.vertical_tally
+        position.rules = self.rules
+        return position
+
+    def _relocate(self, player: int, origin: int, destination: int) -> None:
+        """Moves a piece of `player` between two squares, updating hash and window data."""
+        if origin == destination:  # The piece did not travel
+            return
+        rules = self.rules
+        self.boards[player] ^= (1 << origin) | (1 << destination)
+        zobrist = rules.zobrist[player]
+        self.hash ^= zobrist[origin] ^ zobrist[destination]
+        unit, counts, window_tally = rules.window_units[player], self.window_counts, rules.window_tally
+        horizontal, vertical = self.horizontal_tally, self.vertical_tally
+        for index in rules.horizontal_by_square[origin]:
+            state = counts[index]
+            counts[index] = state - unit
+            horizontal += window_tally[state - unit] - window_tally[state]
+        for index in rules.vertical_by_square[origin]:
+            state = counts[index]
+            counts[index] = state - unit
+            vertical += window_tally[state - unit] - window_tally[state]
+        for index in rules.horizontal_by_square[destination]:
+            state = counts[index]
+            counts[index] = state + unit
+            horizontal += window_tally[state + unit] - window_tally[state]
+        for index in rules.vertical_by_square[destination]:
+            state = counts[index]
+            counts[index] = state + unit
+            vertical += window_tally[state + unit] - window_tally[state]
+        self.horizontal_tally, self.vertical_tally = horizontal, vertical
+
+    def make_move(self, move: int, player: int) -> tuple[int, int]:
+        """Plays `move` for `player` in place and returns the (origin, destination) undo record."""
+        origin, destination = move >> 2, self.destination(move)
+        self._relocate(player, origin, destination)
+        return origin, destination
+
+    def unmake_move(self, undo: tuple[int, int], player: int) -> None:
+        """Takes back the move described by the undo record returned by `make_move`."""
+        origin, destination = undo
+        self._relocate(player, destination, origin)
+
+    def play(self, move: int, player: int) -> "Position":
+        """Returns a new position reached after `player` plays `move`, leaving this one untouched."""
+        child = self.copy()
+        child.make_move(move, player)
+        return child
+
+    def winner(self) -> int:
+        """Returns the player with a full line, or 0 if there is none."""
+        has_line = self.rules.has_line
+        if has_line(self.boards[1]):
+            return 1
+        if has_line(self.boards[2]):
+            return 2
+        return 0
+
+    def patterns(self, player: int) -> tuple[int, int, int]:
+        """Returns how many full lines, threes and twos (see Rules) `player` has across all windows."""
+        return self.rules.unpack_tally(self.horizontal_tally + self.vertical_tally, player)
+
+    def horizontal_patterns(self, player: int) -> tuple[int, int, int]:
+        """`patterns` over the horizontal windows only."""
+        return self.rules.unpack_tally(self.horizontal_tally, player)
+
+    def mobility(self, player: int) -> int:
+        """Counts the pieces of `player` that can move."""
+        rules = self.rules
+        empty = ~(self.boards[1] | self.boards[2]) & rules.full_mask
+        return rules.movable_pieces(self.boards[player], empty).bit_count()
+
+
+def from_table(table: List[List[int]], rules: Rules = DEFAULT_RULES) -> Position:
+    """Converts a list-of-lists game table into a bitboard position."""
+    boards = [0, 0, 0]
+    size = rules.size
+    for row in range(size):
+        for col in range(size):
+            if table[row][col]:
+                boards[table[row][col]] |= 1 << (row * size + col)
+    return Position(boards[1], boards[2], rules=rules)
+
+
+def to_table(position: Position) -> List[List[int]]:
+    """Converts a bitboard position back into a list-of-lists game table."""
+    size = position.rules.size
+    table = [[0 for _ in range(size)] for _ in range(size)]
+    for player in (1, 2):
+        for square in range(position.rules.num_squares):
+            if position.boards[player] >> square & 1:
+                table[square // size][square % size] = player
+    return table
+
+
+def move_to_dict(move: Optional[int], rules: Rules = DEFAULT_RULES) -> dict:
+    """Converts a move code into the `{'piece': ..., 'direction': ...}` dict used by the game loop."""
+    if move is None:
+        return {}
+    row, col = divmod(move >> 2, rules.size)
+    dr, dc = DIRECTIONS[move & 3]
+    return {'piece': {'row': row, 'col': col}, 'direction': {'vertical': dr, 'horizontal': dc}}
+
+
+def move_from_dict(move: Dict[str, Dict[str, int]], rules: Rules = DEFAULT_RULES) -> int:
+    """Converts a game-loop move dict into a move code."""
+    direction = DIRECTIONS.index((move['direction']['vertical'], move['direction']['horizontal']))
+    return encode_move(move['piece']['row'] * rules.size + move['piece']['col'], direction)
@@ -0,0 +1,59 @@
+"""Offline builder for the hard CPU's opening book.
+
+Walks every position reachable from the initial table within `--plies` moves, merging
+symmetric and colour-swapped duplicates. Each one is searched with minimax_hard at a fixed
+`--depth`, and the best moves are written as a sorted binary book (see opening_book):
+
+    python build_opening_book.py --plies 3 --depth 6
+"""
+import argparse
+import math
+import time
+from pathlib import Path
+from bitboard import from_table
+from cpu_ai import minimax_hard
+from opening_book import DEFAULT_BOOK_PATH, write_book
+from symmetry import canonical_key, position_from_key
+from transposition import TranspositionTable
+from utils import create_initial_table
+
+SCORE_LIMIT = 2 ** 15 - 1  # Scores are stored as signed 16-bit integers
+
+
+def build_book(plies: int, depth: int, verbose: bool = True) -> dict[int, tuple[int, int]]:
+    """Searches the opening tree and returns {canonical key: (canonical move, score)}.
+
+    Canonical positions always have the side to move as player 1, so every search is run for
+    player 1 and its best move is already in the canonical frame.
+    """
+    entries, tt = {}, TranspositionTable()
+    frontier = {canonical_key(from_table(create_initial_table()), 1)[0]}
+    for ply in range(plies + 1):
+        start, next_frontier = time.perf_counter(), set()
+        for key in sorted(frontier):
+            position = position_from_key(key, 1)
+            score, move = minimax_hard(position, depth, -math.inf, math.inf, True, 1, depth + 2, tt=tt)
+            if move is not None:
+                entries[key] = (move, max(-SCORE_LIMIT, min(SCORE_LIMIT, int(score))))
+            if ply == plies:
+                continue
+            for reply in position.moves(1):
+                child = position.play(reply, 1)
+                if not child.winner():
+                    next_frontier.add(canonical_key(child, 2)[0])
+        if verbose:
+            print(f"ply {ply}: {len(frontier)} positions in {time.perf_counter() - start:.1f}s")
+        frontier = next_frontier - entries.keys()
+    return entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the opening book used by the hard CPU")
+    parser.add_argument("--plies", type=int, default=3, help="opening moves covered by the book")
+    parser.add_argument("--depth", type=int, default=6, help="search depth for every book position")
+    parser.add_argument("--output", type=Path, default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args()
+
+    book = build_book(args.plies, args.depth)
+    write_book(args.output, book)
+    print(f"wrote {len(book)} positions to {args.output}")
@@ -1,244 +1,569 @@
 import math
-from typing import List, Dict
-from utils import TABLE_SIZE, check_winner, get_available_squares, move_piece
+import threading
+import time
+from typing import Callable, Optional, Sequence
+from bitboard import DEFAULT_RULES, DIRECTIONS, NUM_SQUARES, Position, Rules, from_table, move_to_dict
+from opening_book import OpeningBook, default_book
+from repetition import PositionHistory, position_key
+from threat_solver import UNKNOWN, WIN, ThreatSolver
+from transposition import EXACT, LOWER, UPPER, TranspositionTable
 
-def evaluate_board_normal(table: list[list[int]], player: int) -> int:
+# Weights for different patterns
+WEIGHTS = {
+    'win': 10000,
+    'three_in_row': 100,
+    'two_in_row': 10,
+    'center_control': 5,
+    'mobility': 2,
+}
+
+# Scores many leaves in one call: (green bitboards, red bitboards, player) -> scores
+BatchEvaluator = Callable[[list[int], list[int], int], Sequence[int]]
+
+MAX_SEARCH_DEPTH = 64  # Upper bound for iterative deepening under a time or node budget
+MAX_PLY = 2 * MAX_SEARCH_DEPTH  # Killer slots; depth extensions can take a line past its nominal depth
+MOVE_CODES = NUM_SQUARES * len(DIRECTIONS)  # On the standard board; see Rules.move_codes
+DRAW_SCORE = 0  # Score of a line that repeats an earlier position
+NORMAL_DEPTH = 3  # Search depth of the normal CPU
+
+
+class SearchTimeout(Exception):
+    """Raised inside the search when its time or node budget runs out."""
+
+
+class SearchLimits:
+    """Time and node budget shared by every node of one search.
+
+    A `stop` event cancels the search from another thread as soon as it is set.
+    """
+
+    __slots__ = ("deadline", "max_nodes", "nodes", "stop")
+
+    def __init__(self, time_limit: Optional[float] = None, max_nodes: Optional[int] = None,
+                 stop: Optional[threading.Event] = None) -> None:
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.stop = stop
+
+    def tick(self) -> None:
+        """Counts one node and raises SearchTimeout once the budget is spent."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchTimeout
+        # Reading the clock or the event is comparatively slow, so only do it every 256 nodes
+        if not self.nodes & 255:
+            if self.deadline is not None and time.perf_counter() >= self.deadline:
+                raise SearchTimeout
+            if self.stop is not None and self.stop.is_set():
+                raise SearchTimeout
+
+
+class SearchStats:
+    """Optional counters filled in by the search functions when passed as `stats`."""
+
+    __slots__ = ("nodes_by_depth", "leaf_evaluations", "interior_nodes", "children_searched",
+                 "beta_cutoffs", "first_move_cutoffs", "movegen_time", "evaluation_time",
+                 "ordering_time", "completed_depth", "score")
+
+    def __init__(self) -> None:
+        self.nodes_by_depth: dict[int, int] = {}  # By remaining depth, so 0 counts the leaves
+        self.leaf_evaluations = 0
+        self.interior_nodes = 0
+        self.children_searched = 0
+        self.beta_cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.movegen_time = 0.0  # Seconds, like the other times
+        self.evaluation_time = 0.0
+        self.ordering_time = 0.0
+        self.completed_depth = 0
+        self.score: Optional[float] = None  # Of the move returned, for the searching player; None without a search
+
+    @property
+    def nodes(self) -> int:
+        """Total number of nodes visited."""
+        return sum(self.nodes_by_depth.values())
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        """Share of beta cutoffs produced by the first move searched."""
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """Effective branching factor: children actually searched per interior node."""
+        return self.children_searched / self.interior_nodes if self.interior_nodes else 0.0
+
+    def as_dict(self) -> dict:
+        """Returns the counters and derived figures as a JSON-friendly dict."""
+        return {
+            "nodes": self.nodes,
+            "nodes_by_depth": dict(sorted(self.nodes_by_depth.items(), reverse=True)),
+            "leaf_evaluations": self.leaf_evaluations,
+            "beta_cutoffs": self.beta_cutoffs,
+            "first_move_cutoff_rate": round(self.first_move_cutoff_rate, 4),
+            "branching_factor": round(self.branching_factor, 3),
+            "completed_depth": self.completed_depth,
+            "score": self.score,
+            "movegen_time": round(self.movegen_time, 6),
+            "evaluation_time": round(self.evaluation_time, 6),
+            "ordering_time": round(self.ordering_time, 6),
+        }
+
+
+class MoveOrdering:
+    """Killer moves and history scores learned from beta cutoffs, used to order moves."""
+
+    __slots__ = ("killers", "history")
+
+    def __init__(self, move_codes: int = MOVE_CODES) -> None:
+        # The last two moves that caused a cutoff, per ply
+        self.killers: list[list[Optional[int]]] = [[None, None] for _ in range(MAX_PLY)]
+        # Per side and move code (see Rules.move_codes), depth * depth for every cutoff it caused
+        self.history: list[list[int]] = [[], [0] * move_codes, [0] * move_codes]
+
+    def order(self, moves: list[int], side: int, ply: int, hash_move: Optional[int] = None) -> list[int]:
+        """Sorts `moves` in place: hash move, then killers, then by history score."""
+        moves.sort(key=self.history[side].__getitem__, reverse=True)
+        if ply < MAX_PLY:
+            for killer in reversed(self.killers[ply]):
+                if killer is not None and killer in moves:
+                    moves.remove(killer)
+                    moves.insert(0, killer)
+        if hash_move is not None and hash_move in moves:
+            moves.remove(hash_move)
+            moves.insert(0, hash_move)
+        return moves
+
+    def age(self, plies: int = 2) -> None:
+        """Prepares for a search `plies` further into the game."""
+        # Killers move up to the plies they now correspond to
+        self.killers = self.killers[plies:] + [[None, None] for _ in range(plies)]
+        # Halving history scores lets recent cutoffs outweigh old ones
+        for side in (1, 2):
+            self.history[side] = [score >> 1 for score in self.history[side]]
+
+    def record_cutoff(self, move: int, side: int, ply: int, depth: int) -> None:
+        """Rewards a move that produced a beta cutoff `depth` plies above the leaves."""
+        self.history[side][move] += depth * depth
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1], killers[0] = killers[0], move
+
+
+def evaluate_board_normal(position: Position, player: int) -> int:
     """Assigns a score to the current board state."""
-    opponent = 3 - player
-    score = 0
-    
-    # Check rows and columns for potential wins
-    for i in range(TABLE_SIZE):
-        for j in range(TABLE_SIZE - 3):
-            line = table[i][j:j+4]
-            if line.count(player) == 4:
-                return 1000  # AI wins
-            elif line.count(opponent) == 4:
-                return -1000  # Opponent wins
-            elif line.count(player) == 3 and line.count(0) == 1:
-                score += 10
-            elif line.count(opponent) == 3 and line.count(0) == 1:
-                score -= 10
-    
-    return score
+    # Only rows count, read from the incrementally kept horizontal tally
+    player_lines, player_threes, _ = position.horizontal_patterns(player)
+    opponent_lines, opponent_threes, _ = position.horizontal_patterns(3 - player)
+    if player_lines:
+        return 1000  # AI wins
+    elif opponent_lines:
+        return -1000  # Opponent wins
+    return 10 * (player_threes - opponent_threes)
 
 
-def minimax_normal(table: list[list[int]], depth: int, alpha: int, beta: int, maximizing: bool, player: int) -> tuple[int, dict]:
-    """Minimax algorithm with alpha-beta pruning."""
+def minimax_normal(position: Position, depth: int, alpha: int, beta: int, maximizing: bool, player: int,
+                   stats: Optional[SearchStats] = None,
+                   history: Optional[PositionHistory] = None) -> tuple[int, Optional[int]]:
+    """Minimax algorithm with alpha-beta pruning; moves back into a position in `history` score as draws."""
+    if stats is not None:
+        stats.nodes_by_depth[depth] = stats.nodes_by_depth.get(depth, 0) + 1
     opponent = 3 - player
-    winner = check_winner(table)
+    winner = position.winner()
     if winner == player:
-        return 1000, {}
+        return 1000, None
     elif winner == opponent:
-        return -1000, {}
+        return -1000, None
     elif depth == 0:
-        return evaluate_board_normal(table, player), {}
-    
-    best_move = {}
-    
+        if stats is None:
+            return evaluate_board_normal(position, player), None
+        start = time.perf_counter()
+        score = evaluate_board_normal(position, player)
+        stats.evaluation_time += time.perf_counter() - start
+        stats.leaf_evaluations += 1
+        return score, None
+
+    side = player if maximizing else opponent
+    if stats is None:
+        pieces = position.piece_moves(side)
+    else:
+        start = time.perf_counter()
+        pieces = position.piece_moves(side)
+        stats.movegen_time += time.perf_counter() - start
+        stats.interior_nodes += 1
+    if history is not None:
+        history.push(position_key(position, side))
+
+    best_move = None
+    # A cutoff below only leaves the current piece's moves, and the node goes on with the next
+    # piece. Count at most one cutoff per node, and a first-move cutoff only for its first move.
+    searched, cut = 0, False
+
     if maximizing:
         max_eval = -math.inf
-        for move in get_available_squares(table, player):
-            for direction in move['available_moves']:
-                new_table = move_piece([row[:] for row in table], move['square_position'], direction, player)
-                eval_score, _ = minimax_normal(new_table, depth - 1, alpha, beta, False, player)
+        for _, moves in pieces:
+            for move in moves:
+                undo = position.make_move(move, player)
+                if history is not None and position_key(position, opponent) in history:
+                    eval_score = DRAW_SCORE
+                else:
+                    eval_score, _ = minimax_normal(position, depth - 1, alpha, beta, False, player, stats, history)
+                position.unmake_move(undo, player)
+                searched += 1
+                if stats is not None:
+                    stats.children_searched += 1
                 if eval_score > max_eval:
                     max_eval = eval_score
-                    best_move = {'piece': move['square_position'], 'direction': direction}
+                    best_move = move
                 alpha = max(alpha, eval_score)
                 if beta <= alpha:
+                    if stats is not None and not cut:
+                        stats.beta_cutoffs += 1
+                        stats.first_move_cutoffs += searched == 1
+                    cut = True
                     break
+        if history is not None:
+            history.pop()
         return max_eval, best_move
     else:
         min_eval = math.inf
-        for move in get_available_squares(table, opponent):
-            for direction in move['available_moves']:
-                new_table = move_piece([row[:] for row in table], move['square_position'], direction, opponent)
-                eval_score, _ = minimax_normal(new_table, depth - 1, alpha, beta, True, player)
+        for _, moves in pieces:
+            for move in moves:
+                undo = position.make_move(move, opponent)
+                if history is not None and position_key(position, player) in history:
+                    eval_score = DRAW_SCORE
+                else:
+                    eval_score, _ = minimax_normal(position, depth - 1, alpha, beta, True, player, stats, history)
+                position.unmake_move(undo, opponent)
+                searched += 1
+                if stats is not None:
+                    stats.children_searched += 1
                 if eval_score < min_eval:
                     min_eval = eval_score
                 beta = min(beta, eval_score)
                 if beta <= alpha:
+                    if stats is not None and not cut:
+                        stats.beta_cutoffs += 1
+                        stats.first_move_cutoffs += searched == 1
+                    cut = True
                     break
-        return min_eval, {}
+        if history is not None:
+            history.pop()
+        return min_eval, None
+
 
+def ai_best_move_normal(table: list[list[int]], player: int, stats: Optional[SearchStats] = None,
+                        history: Optional[PositionHistory] = None, rules: Rules = DEFAULT_RULES,
+                        depth: int = NORMAL_DEPTH) -> dict:
+    """Determines the AI's best move using Minimax searched `depth` plies deep."""
+    score, best_move = minimax_normal(from_table(table, rules), depth=depth, alpha=-math.inf, beta=math.inf,
+                                      maximizing=True, player=player, stats=stats, history=history)
+    if stats is not None:
+        stats.completed_depth = depth
+        stats.score = score
+    return move_to_dict(best_move, rules)
 
-def ai_best_move_normal(table: list[list[int]], player: int) -> dict:
-    """Determines the AI's best move using Minimax."""
-    _, best_move = minimax_normal(table, depth=3, alpha=-math.inf, beta=math.inf, maximizing=True, player=player)
-    return best_move
+def evaluate_board_hard(position: Position, player: int) -> int:
+    """Enhanced board evaluation function.
 
-def evaluate_board_hard(table: list[list[int]], player: int) -> int:
-    """Enhanced board evaluation function."""
+    Reads the window pattern counts the position maintains incrementally, so its cost does not
+    depend on the number of windows.
+    """
     opponent = 3 - player
-    score = 0
-    
-    # Weights for different patterns
-    WEIGHTS = {
-        'win': 10000,
-        'three_in_row': 100,
-        'two_in_row': 10,
-        'center_control': 5,
-        'mobility': 2,
-    }
-    
-    def count_consecutive(line: List[int], player: int) -> Dict[str, int]:
-        """Count consecutive pieces and gaps in a line."""
-        counts = {'three': 0, 'two': 0, 'gaps': 0}
-        for i in range(len(line) - 3):
-            window = line[i:i+4]
-            player_count = window.count(player)
-            empty_count = window.count(0)
-            
-            if player_count == 3 and empty_count == 1:
-                counts['three'] += 1
-            elif player_count == 2 and empty_count == 2:
-                counts['two'] += 1
-                
-            if empty_count > 0:
-                counts['gaps'] += empty_count
-        return counts
-
-    # Check horizontal lines
-    for row in range(TABLE_SIZE):
-        for col in range(TABLE_SIZE - 3):
-            line = [table[row][col + i] for i in range(4)]
-            
-            # Check for immediate wins
-            if line.count(player) == 4:
-                return WEIGHTS['win']
-            elif line.count(opponent) == 4:
-                return -WEIGHTS['win']
-            
-            # Count patterns for both players
-            player_counts = count_consecutive(line, player)
-            opponent_counts = count_consecutive(line, opponent)
-            
-            score += (player_counts['three'] * WEIGHTS['three_in_row']
-                     + player_counts['two'] * WEIGHTS['two_in_row']
-                     - opponent_counts['three'] * WEIGHTS['three_in_row']
-                     - opponent_counts['two'] * WEIGHTS['two_in_row'])
-
-    # Check vertical lines
-    for col in range(TABLE_SIZE):
-        for row in range(TABLE_SIZE - 3):
-            line = [table[row + i][col] for i in range(4)]
-            
-            # Check for immediate wins
-            if line.count(player) == 4:
-                return WEIGHTS['win']
-            elif line.count(opponent) == 4:
-                return -WEIGHTS['win']
-            
-            # Count patterns for both players
-            player_counts = count_consecutive(line, player)
-            opponent_counts = count_consecutive(line, opponent)
-            
-            score += (player_counts['three'] * WEIGHTS['three_in_row']
-                     + player_counts['two'] * WEIGHTS['two_in_row']
-                     - opponent_counts['three'] * WEIGHTS['three_in_row']
-                     - opponent_counts['two'] * WEIGHTS['two_in_row'])
+    player_fours, player_threes, player_twos = position.patterns(player)
+    opponent_fours, opponent_threes, opponent_twos = position.patterns(opponent)
+
+    # Check for immediate wins
+    if player_fours:
+        return WEIGHTS['win']
+    elif opponent_fours:
+        return -WEIGHTS['win']
+
+    # Count patterns for both players
+    score = ((player_threes - opponent_threes) * WEIGHTS['three_in_row']
+             + (player_twos - opponent_twos) * WEIGHTS['two_in_row'])
 
     # Evaluate center control (pieces in the central 2x2 area)
-    center_pieces = sum(1 for i in range(2, 4) for j in range(2, 4) if table[i][j] == player)
-    score += center_pieces * WEIGHTS['center_control']
+    score += (position.boards[player] & position.rules.center_mask).bit_count() * WEIGHTS['center_control']
 
-    # Evaluate mobility (available moves)
-    player_mobility = len(get_available_squares(table, player))
-    opponent_mobility = len(get_available_squares(table, opponent))
-    score += (player_mobility - opponent_mobility) * WEIGHTS['mobility']
+    # Evaluate mobility (pieces that can move)
+    score += (position.mobility(player) - position.mobility(opponent)) * WEIGHTS['mobility']
 
     return score
 
-def minimax_hard(table: list[list[int]], depth: int, alpha: int, beta: int, maximizing: bool, 
-           player: int, max_depth: int) -> tuple[int, dict]:
-    """Enhanced minimax algorithm with alpha-beta pruning and dynamic depth."""
+def minimax_hard(position: Position, depth: int, alpha: int, beta: int, maximizing: bool,
+           player: int, max_depth: int, *, tt: Optional[TranspositionTable] = None,
+           limits: Optional[SearchLimits] = None, stats: Optional[SearchStats] = None,
+           batch_evaluator: Optional[BatchEvaluator] = None, ordering: Optional[MoveOrdering] = None,
+           ply: int = 0, history: Optional[PositionHistory] = None) -> tuple[int, Optional[int]]:
+    """Enhanced minimax algorithm with alpha-beta pruning, dynamic depth and an optional transposition table."""
+    # The position and history are changed in place and restored on return, except when
+    # SearchTimeout escapes: then the position must be discarded and the history truncated.
+    if limits is not None:
+        limits.tick()
+    if stats is not None:
+        stats.nodes_by_depth[depth] = stats.nodes_by_depth.get(depth, 0) + 1
     opponent = 3 - player
-    winner = check_winner(table)
-    
+    winner = position.winner()
+
     # Terminal states
     if winner == player:
-        return 10000 + depth, {}  # Prefer winning sooner
+        return 10000 + depth, None  # Prefer winning sooner
     elif winner == opponent:
-        return -10000 - depth, {}  # Prefer losing later
-    elif depth == 0:
-        return evaluate_board_hard(table, player), {}
+        return -10000 - depth, None  # Prefer losing later
 
-    best_move = {}
-    
-    if maximizing:
+    side = player if maximizing else opponent
+    if history is not None and ply and position_key(position, side) in history:
+        return DRAW_SCORE, None  # The line has cycled back to an earlier position
+
+    if depth == 0:
+        if stats is None:
+            return evaluate_board_hard(position, player), None
+        start = time.perf_counter()
+        score = evaluate_board_hard(position, player)
+        stats.evaluation_time += time.perf_counter() - start
+        stats.leaf_evaluations += 1
+        return score, None
+
+    if ordering is None:  # Share one MoveOrdering across an iterative deepening run to keep what it learned
+        ordering = MoveOrdering(position.rules.move_codes)
+    hash_move = None
+    if tt is not None:
+        key = position.hash ^ position.rules.side_keys[side]
+        entry = tt.probe(key)
+        if entry is not None:
+            _, entry_depth, entry_score, bound, hash_move, _ = entry
+            if entry_depth == depth:  # Win scores depend on the depth left, so only reuse equal depths
+                if bound == EXACT:
+                    return entry_score, hash_move
+                if bound == LOWER and entry_score >= beta:
+                    return entry_score, hash_move
+                if bound == UPPER and entry_score <= alpha:
+                    return entry_score, hash_move
+        alpha_orig, beta_orig = alpha, beta
+
+    if stats is None:
+        pieces = position.piece_moves(side)
+        moves = [move for _, piece_moves in pieces for move in piece_moves]
+        ordering.order(moves, side, ply, hash_move)
+    else:
+        start = time.perf_counter()
+        pieces = position.piece_moves(side)
+        moves = [move for _, piece_moves in pieces for move in piece_moves]
+        generated = time.perf_counter()
+        ordering.order(moves, side, ply, hash_move)
+        stats.movegen_time += generated - start
+        stats.ordering_time += time.perf_counter() - generated
+        stats.interior_nodes += 1
+
+    # A cutoff must leave the whole move list: searching on with alpha >= beta would
+    # return scores that are not valid bounds, and those would poison the table.
+    best_move = None
+
+    # Adaptive depth based on game phase
+    child_depth = depth - 1
+    if maximizing and len(pieces) < 3 and depth < max_depth:  # Fewer moves available, search deeper
+        child_depth += 1
+
+    if history is not None:
+        history.push(position_key(position, side))
+
+    if batch_evaluator is not None and child_depth == 0 and moves:
+        if position.rules is not DEFAULT_RULES:  # Batch evaluators only know the standard board
+            raise ValueError("batch evaluators only score positions of DEFAULT_RULES")
+        scores = _score_last_ply(position, moves, side, player, limits, stats, batch_evaluator, history)
+        result = max(scores) if maximizing else min(scores)
+        best_move = moves[scores.index(result)]
+        index = len(moves) - 1
+    elif maximizing:
         max_eval = -math.inf
-        moves = get_available_squares(table, player)
-        
-        # Sort moves by preliminary evaluation for better pruning
-        moves.sort(key=lambda m: preliminary_evaluate_move(table, m, player), reverse=True)
-        
-        for move in moves:
-            for direction in move['available_moves']:
-                new_table = move_piece([row[:] for row in table], move['square_position'], direction, player)
-                
-                # Adaptive depth based on game phase
-                current_depth = depth
-                if len(moves) < 3 and depth < max_depth:  # Fewer moves available, search deeper
-                    current_depth += 1
-                
-                eval_score, _ = minimax_hard(new_table, current_depth - 1, alpha, beta, False, player, max_depth)
-                
-                if eval_score > max_eval:
-                    max_eval = eval_score
-                    best_move = {'piece': move['square_position'], 'direction': direction}
-                
-                alpha = max(alpha, eval_score)
-                if beta <= alpha:
-                    break
-        
-        return max_eval, best_move
+
+        for index, move in enumerate(moves):
+            undo = position.make_move(move, player)
+            eval_score, _ = minimax_hard(position, child_depth, alpha, beta, False, player, max_depth, tt=tt,
+                                         limits=limits, stats=stats, batch_evaluator=batch_evaluator,
+                                         ordering=ordering, ply=ply + 1, history=history)
+            position.unmake_move(undo, player)
+
+            if eval_score > max_eval:
+                max_eval = eval_score
+                best_move = move
+
+            alpha = max(alpha, eval_score)
+            if beta <= alpha:
+                ordering.record_cutoff(move, side, ply, depth)
+                if stats is not None:
+                    stats.beta_cutoffs += 1
+                    stats.first_move_cutoffs += index == 0
+                break
+
+        result = max_eval
     else:
         min_eval = math.inf
-        moves = get_available_squares(table, opponent)
-        
-        # Sort moves by preliminary evaluation for better pruning
-        moves.sort(key=lambda m: preliminary_evaluate_move(table, m, opponent), reverse=True)
-        
-        for move in moves:
-            for direction in move['available_moves']:
-                new_table = move_piece([row[:] for row in table], move['square_position'], direction, opponent)
-                eval_score, _ = minimax_hard(new_table, depth - 1, alpha, beta, True, player, max_depth)
-                
-                if eval_score < min_eval:
-                    min_eval = eval_score
-                
-                beta = min(beta, eval_score)
-                if beta <= alpha:
-                    break
-        
-        return min_eval, {}
-
-def preliminary_evaluate_move(table: list[list[int]], move: dict, player: int) -> int:
-    """Quick evaluation of a move for move ordering."""
-    score = 0
-    row, col = move['square_position']['row'], move['square_position']['col']
-    
-    # Prefer central positions
-    score += (3 - abs(row - 2.5)) + (3 - abs(col - 2.5))
-    
-    # Prefer moves that can create or block winning patterns
-    for direction in move['available_moves']:
-        new_table = move_piece([row[:] for row in table], move['square_position'], direction, player)
-        if check_winner(new_table) == player:
-            score += 1000
-    
-    return score
 
-def ai_best_move_hard(table: list[list[int]], player: int) -> dict:
-    """Determines the AI's best move using enhanced Minimax."""
+        for index, move in enumerate(moves):
+            undo = position.make_move(move, opponent)
+            eval_score, _ = minimax_hard(position, child_depth, alpha, beta, True, player, max_depth, tt=tt,
+                                         limits=limits, stats=stats, batch_evaluator=batch_evaluator,
+                                         ordering=ordering, ply=ply + 1, history=history)
+            position.unmake_move(undo, opponent)
+
+            if eval_score < min_eval:
+                min_eval = eval_score
+                best_move = move  # Kept for the transposition table only
+
+            beta = min(beta, eval_score)
+            if beta <= alpha:
+                ordering.record_cutoff(move, side, ply, depth)
+                if stats is not None:
+                    stats.beta_cutoffs += 1
+                    stats.first_move_cutoffs += index == 0
+                break
+
+        result = min_eval
+
+    if history is not None:
+        history.pop()
+    if stats is not None:
+        stats.children_searched += index + 1 if moves else 0
+
+    if tt is not None and best_move is not None:
+        if result <= alpha_orig:
+            bound = UPPER
+        elif result >= beta_orig:
+            bound = LOWER
+        else:
+            bound = EXACT
+        tt.store(key, depth, result, bound, best_move)
+
+    return result, best_move if maximizing else None
+
+def _score_last_ply(position: Position, moves: list[int], side: int, player: int, limits: Optional[SearchLimits],
+                    stats: Optional[SearchStats], batch_evaluator: BatchEvaluator,
+                    history: Optional[PositionHistory] = None) -> list[int]:
+    """Scores every child of a node one ply above the leaves, as minimax_hard would at depth 0.
+
+    Won and repeated children are scored directly; all others go to `batch_evaluator` in a single call.
+    """
+    scores, greens, reds, pending = [0] * len(moves), [], [], []
+    for index, move in enumerate(moves):
+        if limits is not None:
+            limits.tick()
+        undo = position.make_move(move, side)
+        winner = position.winner()
+        if winner:
+            scores[index] = 10000 if winner == player else -10000
+        elif history is not None and position_key(position, 3 - side) in history:
+            scores[index] = DRAW_SCORE
+        else:
+            greens.append(position.boards[1])
+            reds.append(position.boards[2])
+            pending.append(index)
+        position.unmake_move(undo, side)
+
+    start = time.perf_counter() if stats is not None else 0.0
+    if pending:
+        for index, score in zip(pending, batch_evaluator(greens, reds, player)):
+            scores[index] = int(score)
+    if stats is not None:
+        stats.evaluation_time += time.perf_counter() - start
+        stats.nodes_by_depth[0] = stats.nodes_by_depth.get(0, 0) + len(moves)
+        stats.leaf_evaluations += len(pending)
+    return scores
+
+def default_hard_depth(position: Position) -> int:
+    """Returns the fixed search depth used by the hard CPU when it has no time or node budget."""
     # Increase depth for more challenging gameplay
     base_depth = 4
-    
+
     # Adjust depth based on game phase
-    available_moves = sum(1 for row in table for cell in row if cell == 0)
+    available_moves = position.rules.num_squares - position.occupied().bit_count()
     if available_moves < 10:  # End game
         base_depth += 1
-    
-    _, best_move = minimax_hard(table, base_depth, -math.inf, math.inf, True, player, base_depth + 2)
-    return best_move
\ No newline at end of file
+    return base_depth
+
+def principal_variation(position: Position, player: int, tt: TranspositionTable, length: int) -> list[int]:
+    """Follows the table's best moves from `position`, `player` to move, for up to `length` plies."""
+    position, side, line = position.copy(), player, []
+    while len(line) < length and not position.winner():
+        entry = tt.probe(position.hash ^ position.rules.side_keys[side])
+        if entry is None or entry[4] is None or entry[4] not in position.moves(side):
+            break
+        line.append(entry[4])
+        position.make_move(entry[4], side)
+        side = 3 - side
+    return line
+
+def ai_best_move_hard(table: list[list[int]], player: int, tt: Optional[TranspositionTable] = None,
+                      time_limit: Optional[float] = None, max_nodes: Optional[int] = None,
+                      stats: Optional[SearchStats] = None, batch_evaluator: Optional[BatchEvaluator] = None,
+                      use_book: bool = True, book: Optional[OpeningBook] = None, use_solver: bool = True,
+                      history: Optional[PositionHistory] = None,
+                      pondered: Optional[dict[int, tuple[int, int, int, float]]] = None,
+                      ordering: Optional[MoveOrdering] = None, rules: Rules = DEFAULT_RULES,
+                      depth: Optional[int] = None) -> dict:
+    """Determines the AI's best move using enhanced Minimax with iterative deepening."""
+    position = from_table(table, rules)
+    # The opening book only covers the standard game
+    if use_book and rules is DEFAULT_RULES and (book := book or default_book()) is not None:
+        if (entry := book.lookup(position, player)) is not None:
+            if stats is not None:
+                stats.score = entry[1]
+            return move_to_dict(entry[0])
+
+    if use_solver:
+        result, move, _ = ThreatSolver().solve(position, player)
+        if result != UNKNOWN and move is not None:
+            if stats is not None:
+                stats.score = WEIGHTS['win'] if result == WIN else -WEIGHTS['win']
+            return move_to_dict(move, rules)
+
+    if tt is None:
+        tt = TranspositionTable()
+    if ordering is None:
+        ordering = MoveOrdering(rules.move_codes)
+
+    if time_limit is None and max_nodes is None:
+        target_depth = depth or default_hard_depth(position)
+        limits = None
+    else:  # Deepen until the budget runs out, then play the deepest completed iteration's move
+        target_depth = depth or MAX_SEARCH_DEPTH
+        limits = SearchLimits(time_limit, max_nodes)
+
+    best_move, first_depth = None, 1
+    # A ponder.Ponderer result that is forced, deep enough or searched long enough is played at once;
+    # otherwise deepening resumes after its depth
+    if pondered is not None and (entry := pondered.get(position_key(position, player))) is not None:
+        move, pondered_depth, score, seconds = entry
+        if (abs(score) >= WEIGHTS['win'] or pondered_depth >= target_depth
+                or time_limit is not None and seconds >= time_limit):
+            if stats is not None:
+                stats.score = score
+            return move_to_dict(move, rules)
+        best_move, first_depth = move, pondered_depth + 1
+        if time_limit is not None:  # Time spent pondering counts towards this move's budget
+            limits = SearchLimits(time_limit - seconds, max_nodes)
+
+    history_length = len(history) if history is not None else 0
+    for iteration_depth in range(first_depth, target_depth + 1):
+        try:
+            # The first iteration always completes so that there is a move to return
+            score, move = minimax_hard(position, iteration_depth, -math.inf, math.inf, True, player,
+                                       iteration_depth + 2, tt=tt,
+                                       limits=limits if best_move is not None or iteration_depth > 1 else None,
+                                       stats=stats, batch_evaluator=batch_evaluator, ordering=ordering,
+                                       history=history)
+        except SearchTimeout:
+            if history is not None:
+                history.truncate(history_length)  # Drop the abandoned line
+            break
+        if stats is not None:
+            stats.completed_depth = iteration_depth
+            stats.score = score
+        if move is not None:
+            best_move = move
+        if abs(score) >= WEIGHTS['win']:  # Forced result found, deeper search cannot change it
+            break
+    return move_to_dict(best_move, rules)
@@ -0,0 +1,74 @@
+"""Search state kept by a CPU player for a whole game.
+
+Consecutive searches of a game are only two plies apart, so most of what one search learns
+still applies to the next. An EngineSession keeps the transposition table, the killer and
+history tables and the principal variation from move to move, and ages them in between. When
+the opponent plays a reply the ponderer searched, the next search starts from that result
+instead of from depth 1.
+"""
+from typing import Optional
+from bitboard import from_table
+from cpu_ai import (
+    MAX_SEARCH_DEPTH, MoveOrdering, SearchStats, ai_best_move_hard, ai_best_move_normal, principal_variation
+)
+from mcts import MCTSEngine, ai_best_move_mcts
+from ponder import Ponderer
+from repetition import PositionHistory, position_key
+from transposition import DEFAULT_SIZE, TranspositionTable
+
+
+class EngineSession:
+    """One CPU player's engine for one game.
+
+    `difficult` is 1 (normal), 2 (hard) or 3 (MCTS). The normal CPU is a plain fixed-depth
+    search with nothing to carry over. The hard CPU keeps the state described above and is the
+    only one that ponders, and the MCTS CPU keeps its search tree (see mcts.MCTSEngine).
+    """
+
+    def __init__(self, player: int, difficult: int, time_limit: Optional[float] = None, ponder: bool = False,
+                 tt_size: int = DEFAULT_SIZE) -> None:
+        self.player = player
+        self.difficult = difficult
+        self.time_limit = time_limit
+        hard = difficult == 2
+        self.tt = TranspositionTable(tt_size) if hard else None
+        self.ordering = MoveOrdering() if hard else None
+        self.pv: list[int] = []  # Expected line from the last search: our move, their reply, ...
+        self.expected_hits = 0  # Searches that started from a pondered result
+        self.ponderer = Ponderer(self.tt, self.ordering) if ponder and hard else None
+        self.mcts = MCTSEngine() if difficult == 3 else None
+
+    def best_move(self, table: list[list[int]], history: Optional[PositionHistory] = None,
+                  stats: Optional[SearchStats] = None) -> dict:
+        """Chooses the CPU's move on `table`, then ages the kept state for the next move."""
+        if self.difficult == 1:
+            return ai_best_move_normal(table, self.player, stats=stats, history=history)
+        if self.difficult == 3:
+            return ai_best_move_mcts(table, self.player, time_limit=self.time_limit, stats=stats, history=history,
+                                     engine=self.mcts)
+
+        self.stop_pondering()
+        position = from_table(table)
+        key = position_key(position, self.player)
+        # Only the ponderer's own results: a table entry may hold a draw score that came from the
+        # repetition history of another line
+        known = dict(self.ponderer.results) if self.ponderer is not None else {}
+        if key in known:
+            self.expected_hits += 1
+
+        move = ai_best_move_hard(table, self.player, tt=self.tt, time_limit=self.time_limit, stats=stats,
+                                 history=history, pondered=known, ordering=self.ordering)
+        self.pv = principal_variation(position, self.player, self.tt, MAX_SEARCH_DEPTH)
+        self.tt.age()
+        self.ordering.age(2)
+        return move
+
+    def ponder(self, table: list[list[int]], history: Optional[PositionHistory] = None) -> None:
+        """Starts pondering while the opponent is to move on `table` (hard CPU with pondering only)."""
+        if self.ponderer is not None:
+            self.ponderer.start(table, self.player, history)
+
+    def stop_pondering(self) -> None:
+        """Stops pondering, keeping what it found for the next best_move call."""
+        if self.ponderer is not None:
+            self.ponderer.stop()
@@ -0,0 +1,149 @@
+"""Compact binary game records.
+
+A record file starts with an 8-byte magic and then holds games back to back. Each game is a
+4-byte header (first player, result, number of plies) followed by one byte per ply: the
+move code from bitboard.encode_move, which fits in a byte (square * 4 + direction < 144),
+or PASS when the side to move had no piece that could move. Results are 0 for a draw, 1 or
+2 for the winner and UNFINISHED for an abandoned game.
+
+Files are only ever appended to, and `read_games` streams them one game at a time, so
+record files can grow far larger than memory:
+
+    python game_record.py games.crab            # summary of every game in the file
+    python game_record.py games.crab --replay 3 # print the positions of game 3
+"""
+import argparse
+import struct
+from pathlib import Path
+from typing import BinaryIO, Iterator, List, Optional, Union
+from bitboard import move_from_dict, move_to_dict
+from utils import create_initial_table, format_table, move_piece
+
+MAGIC = b"CRABREC1"
+HEADER = struct.Struct(">BBH")  # first player, result, number of plies
+UNFINISHED = 3
+PASS = 0xFF  # Ply byte of a player without any legal move
+MAX_PLIES = 2 ** 16 - 1
+
+
+class GameRecord:
+    """One recorded game: who moved first, how it ended and its move codes."""
+
+    __slots__ = ("first_player", "result", "moves")
+
+    def __init__(self, first_player: int, result: int = UNFINISHED, moves: Optional[bytes] = None) -> None:
+        self.first_player = first_player
+        self.result = result
+        self.moves = moves if moves is not None else b""
+
+    def __len__(self) -> int:
+        return len(self.moves)
+
+    def __eq__(self, other: object) -> bool:
+        return (isinstance(other, GameRecord) and
+                (self.first_player, self.result, self.moves) == (other.first_player, other.result, other.moves))
+
+    def __repr__(self) -> str:
+        return f"GameRecord(first_player={self.first_player}, result={self.result}, plies={len(self.moves)})"
+
+    def pack(self) -> bytes:
+        """Encodes the game as header plus one byte per ply."""
+        if len(self.moves) > MAX_PLIES:
+            raise ValueError(f"games are limited to {MAX_PLIES} plies")
+        return HEADER.pack(self.first_player, self.result, len(self.moves)) + self.moves
+
+
+class GameRecordWriter:
+    """Appends games to a record file, one complete game per write.
+
+    Plies of the game in progress are kept in memory until `finish`, so an interrupted game
+    never leaves a partial record behind.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+            self.file.flush()  # A file left behind by a killed process still reads as a record file
+        self.first_player: Optional[int] = None
+        self.moves = bytearray()
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def start(self, first_player: int) -> None:
+        """Begins a new game, abandoning the plies of an unfinished one."""
+        self.first_player, self.moves = first_player, bytearray()
+
+    def add(self, move: Union[int, dict, None]) -> None:
+        """Records one ply, given as a move code or a game-loop move dict; None or {} is a pass."""
+        if isinstance(move, int):
+            self.moves.append(move)
+        else:
+            self.moves.append(move_from_dict(move) if move else PASS)
+
+    def finish(self, result: int) -> None:
+        """Writes the game in progress with its result and flushes it to disk."""
+        if self.first_player is None:
+            raise ValueError("no game in progress")
+        self.write(GameRecord(self.first_player, result, bytes(self.moves)))
+        self.first_player, self.moves = None, bytearray()
+
+    def write(self, record: GameRecord) -> None:
+        """Appends a complete game."""
+        self.file.write(record.pack())
+        self.file.flush()
+
+    def close(self) -> None:
+        """Closes the file; a game that was never finished is not written."""
+        self.file.close()
+
+
+def iter_games(file: BinaryIO) -> Iterator[GameRecord]:
+    """Yields the games of an open record file, reading one game at a time."""
+    if file.read(len(MAGIC)) != MAGIC:
+        raise ValueError("not a game record file")
+    while header := file.read(HEADER.size):
+        if len(header) < HEADER.size:
+            raise ValueError("truncated game header")
+        first_player, result, plies = HEADER.unpack(header)
+        moves = file.read(plies)
+        if len(moves) < plies:
+            raise ValueError("truncated game")
+        yield GameRecord(first_player, result, moves)
+
+
+def read_games(path: Union[str, Path]) -> Iterator[GameRecord]:
+    """Streams the games stored in a record file."""
+    with open(path, "rb") as file:
+        yield from iter_games(file)
+
+
+def replay(record: GameRecord) -> Iterator[List[List[int]]]:
+    """Yields the table before the first ply and after every ply, rebuilt with move_piece."""
+    table, player = create_initial_table(), record.first_player
+    yield [row[:] for row in table]
+    for move in record.moves:
+        if move != PASS:
+            move = move_to_dict(move)
+            move_piece(table, move['piece'], move['direction'], player)
+        yield [row[:] for row in table]
+        player = 3 - player
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect a binary game record file")
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--replay", type=int, help="print every position of this game (0-based)")
+    args = parser.parse_args()
+
+    for index, record in enumerate(read_games(args.path)):
+        if args.replay is None:
+            print(f"game {index}: first player {record.first_player}, result {record.result}, {len(record)} plies")
+        elif index == args.replay:
+            for ply, table in enumerate(replay(record)):
+                print(f"ply {ply}\n{format_table(table)}\n")
+            break
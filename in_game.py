@@ -1,12 +1,22 @@
-from cpu_ai import ai_best_move_hard, ai_best_move_normal
+import logging
+from typing import Optional
+from cpu_ai import SearchStats
+from engine_session import EngineSession
+from game_record import GameRecordWriter
+from renderer import BoardRenderer
+from repetition import REPETITION_LIMIT, PositionHistory, table_key
 from utils import (
-    GREEN_SQUARE, RED_SQUARE, animate_move_piece, check_winner,
+    FRAME_DELAY, GREEN_SQUARE, RED_SQUARE, animate_move_piece, check_winner,
     choose_first_player, clear_screen, create_initial_table,
-    draw_table, draw_table_with_highlight, get_available_squares, move_piece, show_logo, translate_direction
+    get_available_squares, show_logo, translate_direction
 )
 
 COL_HEADERS = ("A", "B", "C", "D", "E", "F")
 MENU_OPTIONS = ("START", "SHOW RULES", "EXIT")
+HARD_TIME_LIMIT = 1.5  # Seconds the hard CPU may think per move
+MOVE_LIMIT = None  # Moves after which an undecided game is drawn; None for no limit
+
+logger = logging.getLogger(__name__)
 
 
 def show_menu() -> int:
@@ -25,8 +35,9 @@ def show_menu() -> int:
         except ValueError:
             pass  # Ignore invalid input
 
-def handle_next_move(table: list[list[int]], available_squares: list[dict], player: int) -> list[list[int]]:
-    """Handles a player's move with animated movement."""
+def handle_next_move(table: list[list[int]], available_squares: list[dict], player: int,
+                     renderer: BoardRenderer, frame_delay: float = FRAME_DELAY) -> tuple[list[list[int]], dict]:
+    """Handles a player's move with animated movement; returns the table and the move played."""
     def get_user_choice(prompt: str, options: list) -> int:
         while True:
             try:
@@ -36,6 +47,10 @@ def handle_next_move(table: list[list[int]], available_squares: list[dict], play
             except ValueError:
                 pass  # Ignore invalid input
     
+    if not available_squares:  # No piece can move: the turn passes, as it does for the CPU
+        input("No piece can move. Press Enter to pass.")
+        return table, {}
+    
     # Select piece
     for index, square in enumerate(available_squares, start=1):
         row, col = square['square_position']['row'] + 1, COL_HEADERS[square['square_position']['col']]
@@ -44,9 +59,7 @@ def handle_next_move(table: list[list[int]], available_squares: list[dict], play
     chosen_piece = available_squares[get_user_choice("Choose the piece you'd like to move: ", available_squares)]
     
     # Highlight selected piece
-    clear_screen()
-    draw_table_with_highlight(table, (chosen_piece['square_position']['row'], 
-                                    chosen_piece['square_position']['col']))
+    renderer.draw(table, (chosen_piece['square_position']['row'], chosen_piece['square_position']['col']))
     
     # Select direction
     for index, direction in enumerate(chosen_piece['available_moves'], start=1):
@@ -57,36 +70,76 @@ def handle_next_move(table: list[list[int]], available_squares: list[dict], play
         chosen_piece['available_moves']
     )]
     
-    return animate_move_piece(table, chosen_piece['square_position'], chosen_direction, player)
+    move = {'piece': chosen_piece['square_position'], 'direction': chosen_direction}
+    return animate_move_piece(table, move['piece'], move['direction'], player, frame_delay, renderer.draw), move
 
 
-def game_start(game_mode: int, difficult: int = 1) -> None:
-    """Starts and manages the main game loop until a winner is determined."""
-    clear_screen()
+def game_start(game_mode: int, difficult: int = 1, repetition_limit: Optional[int] = REPETITION_LIMIT,
+               move_limit: Optional[int] = MOVE_LIMIT, frame_delay: float = FRAME_DELAY, ponder: bool = True,
+               record_path: Optional[str] = None) -> None:
+    """Starts and manages the main game loop until a winner is determined or the game is drawn.
+
+    The game is drawn when a position (with the same player to move) occurs `repetition_limit`
+    times, or after `move_limit` moves; pass None to turn either rule off.
+    Moves are animated with `frame_delay` seconds between frames; 0 turns animation off.
+    With `ponder`, the hard CPU searches its answers while the human is choosing a move.
+    With `record_path`, the finished game is appended to that binary game record file (see game_record).
+    """
+    renderer = BoardRenderer()
+    # The CPU plays red; its session keeps the search state from move to move
+    session = EngineSession(2, difficult, HARD_TIME_LIMIT, ponder) if game_mode == 2 else None
     table, current_player = create_initial_table(), choose_first_player()
+    history, draw_reason = PositionHistory(), None
+    history.push(table_key(table, current_player))
+    recorder = GameRecordWriter(record_path) if record_path is not None else None
+    if recorder is not None:
+        recorder.start(current_player)
     
     while True:
-        clear_screen()
-        draw_table(table)
+        renderer.draw(table)
         print(f"Player {GREEN_SQUARE if current_player == 1 else RED_SQUARE} turn")
         
         if game_mode == 1 or current_player == 1:  # Human player's turn
             available_squares = get_available_squares(table, current_player)
-            table = handle_next_move(table, available_squares, current_player)
+            if session is not None:
+                session.ponder(table, history)
+            try:
+                table, move = handle_next_move(table, available_squares, current_player, renderer, frame_delay)
+            finally:
+                if session is not None:
+                    session.stop_pondering()
         else:  # AI's turn
-            move = ai_best_move_normal(table, current_player) if difficult == 1 else ai_best_move_hard(table, current_player)
+            # Search statistics are only collected when someone is listening
+            stats = SearchStats() if logger.isEnabledFor(logging.DEBUG) else None
+            move = session.best_move(table, history, stats)
+            if stats is not None:
+                logger.debug("CPU move %s, expected line %s, search stats %s", move, session.pv, stats.as_dict())
             if move:
-                table = animate_move_piece(table, move['piece'], move['direction'], current_player)
+                table = animate_move_piece(table, move['piece'], move['direction'], current_player, frame_delay,
+                                           renderer.draw)
+        if recorder is not None:
+            recorder.add(move)
         
         if (winner := check_winner(table)):
             break
         
         current_player = 3 - current_player  # Switch between 1 and 2
+        
+        if history.record_turn(table, current_player, repetition_limit):
+            draw_reason = f"the same position occurred {repetition_limit} times"
+            break
+        if move_limit is not None and len(history) - 1 >= move_limit:
+            draw_reason = f"{move_limit} moves were played without a winner"
+            break
     
     # Game over
-    clear_screen()
-    draw_table(table)
-    if game_mode == 1:
+    if recorder is not None:
+        recorder.finish(0 if draw_reason is not None else winner)
+        recorder.close()
+    renderer.draw(table)
+    if draw_reason is not None:
+        print(f"🤝 Draw: {draw_reason}.")
+    elif game_mode == 1:
         print(f"🎉 Player {GREEN_SQUARE if winner == 1 else RED_SQUARE} wins! Congratulations!")
     else:
         print(f"🎉 {'You' if winner == 1 else 'CPU'} win! Congratulations!")
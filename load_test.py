@@ -0,0 +1,142 @@
+"""Load-test client for server.py.
+
+Opens `--connections` connections and plays `--games` CPU games over them, choosing random
+legal moves for the human side. Every request's round-trip time is recorded, which for
+moves includes the CPU's reply, and the latency percentiles are printed as JSON:
+
+    python server.py --workers 4 &
+    python load_test.py --games 200 --connections 32 --time-limit 0.2
+
+With `--local` the server is started inside the load test instead.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Optional
+from server import DEFAULT_PORT, GameServer
+from utils import get_available_squares
+
+BUSY_RETRY_DELAY = 0.05  # Seconds to wait before retrying a request refused as busy
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class LoadTest:
+    """Plays games against a server and collects request latencies."""
+
+    def __init__(self, host: str, port: int, difficult: int, time_limit: float, clock: Optional[float],
+                 seed: int) -> None:
+        self.host, self.port = host, port
+        self.difficult, self.time_limit, self.clock = difficult, time_limit, clock
+        self.rng = random.Random(seed)
+        self.latencies: dict[str, list[float]] = {"new": [], "move": []}
+        self.busy = 0
+        self.failed_connections = 0
+        self.results = {"wins": 0, "losses": 0, "draws": 0}
+
+    async def request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, message: dict) -> dict:
+        """Sends one request, retrying while the server is busy, and returns its reply."""
+        while True:
+            start = time.perf_counter()
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("the server closed the connection")
+            reply = json.loads(line)
+            if reply.get("error") != "busy":
+                self.latencies.setdefault(message["op"], []).append(time.perf_counter() - start)
+                return reply
+            self.busy += 1
+            await asyncio.sleep(BUSY_RETRY_DELAY)
+
+    async def play_games(self, games: int) -> None:
+        """Plays `games` games one after another over a single connection, counting it as failed if it breaks."""
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError:
+            self.failed_connections += 1
+            return
+        try:
+            for _ in range(games):
+                state = await self.request(reader, writer, {"op": "new", "mode": "cpu", "difficult": self.difficult,
+                                                            "time_limit": self.time_limit, "clock": self.clock})
+                while state["ok"] and not state["winner"] and not state["draw"]:
+                    move = {"op": "move", "game": state["game"]}  # Without a piece when the human has to pass
+                    if squares := get_available_squares(state["table"], 1):
+                        square = self.rng.choice(squares)
+                        move.update(piece=square["square_position"], direction=self.rng.choice(square["available_moves"]))
+                    state = await self.request(reader, writer, move)
+                if state["ok"]:
+                    outcome = "draws" if not state["winner"] else "wins" if state["winner"] == 1 else "losses"
+                    self.results[outcome] += 1
+                    await self.request(reader, writer, {"op": "close", "game": state["game"]})
+        except ConnectionError:
+            self.failed_connections += 1
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def report(self, elapsed: float) -> dict:
+        """Summarises the latencies (in milliseconds) and outcomes of the run."""
+        summary = {"seconds": round(elapsed, 3), "busy_retries": self.busy,
+                   "failed_connections": self.failed_connections, **self.results}
+        for op in ("new", "move"):
+            values = sorted(self.latencies[op])
+            summary[op] = {"requests": len(values),
+                           **{f"p{round(fraction * 100)}_ms": round(percentile(values, fraction) * 1000, 2)
+                              for fraction in (0.5, 0.9, 0.99)},
+                           "max_ms": round(values[-1] * 1000, 2) if values else 0.0}
+        summary["moves_per_second"] = round(len(self.latencies["move"]) / elapsed, 2) if elapsed else 0.0
+        return summary
+
+
+async def run_load_test(args: argparse.Namespace) -> dict:
+    """Runs the load test described by the command line arguments."""
+    server, serve_task = None, None
+    if args.local:
+        server = GameServer(args.workers)
+        listener = await asyncio.start_server(server.handle_connection, args.host, args.port)
+        serve_task = asyncio.create_task(listener.serve_forever())
+
+    test = LoadTest(args.host, args.port, args.difficult, args.time_limit, args.clock, args.seed)
+    per_connection = [args.games // args.connections + (index < args.games % args.connections)
+                      for index in range(args.connections)]
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(test.play_games(games) for games in per_connection if games))
+    finally:
+        if serve_task is not None:
+            while server.connections:  # Let the server see every client hang up
+                await asyncio.sleep(0.01)
+            serve_task.cancel()
+            server.close()
+    return test.report(time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the game server and report move latency percentiles")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--games", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--difficult", type=int, default=2, choices=(1, 2, 3))
+    parser.add_argument("--time-limit", type=float, default=0.2, help="seconds per CPU move")
+    parser.add_argument("--clock", type=float, default=None, help="total CPU seconds per game")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--local", action="store_true", help="run the server inside this process")
+    parser.add_argument("--workers", type=int, default=None, help="server worker processes with --local")
+    args = parser.parse_args()
+
+    print(json.dumps(asyncio.run(run_load_test(args)), indent=2))
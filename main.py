@@ -1,8 +1,15 @@
+import argparse
 from in_game import game_start, show_menu
 from texts import DIFFICULT, GAME_MODE
-from utils import show_rules
+from utils import FRAME_DELAY, show_rules
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play the Crab Puzzle in the terminal")
+    parser.add_argument("--frame-delay", type=float, default=FRAME_DELAY,
+                        help="seconds between animation frames (0 turns animation off)")
+    parser.add_argument("--record", help="append every finished game to this binary game record file")
+    args = parser.parse_args()
+
     difficult = 0
     game_mode = 0
     while(True):
@@ -14,10 +21,10 @@ if __name__ == "__main__":
                     game_mode = int(input(GAME_MODE))
                 
                 if game_mode == 2:  # vs CPU
-                    while difficult not in [1, 2]:
+                    while difficult not in [1, 2, 3]:
                         difficult = int(input(DIFFICULT))
                 
-                game_start(game_mode, difficult)
+                game_start(game_mode, difficult, frame_delay=args.frame_delay, record_path=args.record)
                 game_mode = 0  # Reset for next game
                 difficult = 0  # Reset for next game
             case 2:
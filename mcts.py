@@ -0,0 +1,307 @@
+"""Monte Carlo tree search player.
+
+A third CPU player that needs no evaluation function. Every iteration walks down the tree by
+UCT, adds one new position, finishes the game from there with quick playouts and credits the
+result to every position on the way back up. The move finally played is the root move that
+was visited most.
+
+Playouts are "light" by default: a side that has three in a row plays a winning move when it
+has one, otherwise moves are random ("random" skips even that). A playout that reaches
+MAX_PLAYOUT_PLIES, or a position where the side to move is stuck, counts as a draw, and so
+does a tree position that repeats the game history or its own line.
+
+The tree is kept between moves: the next search starts from the node of the position the
+opponent's reply led to, with all the playouts already spent below it. `batch_size` runs
+several playouts from each new leaf, and `workers` > 1 adds root-parallel searches in worker
+processes whose root visit counts are merged with the local tree's.
+"""
+import math
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from bitboard import DEFAULT_RULES, Position, Rules, from_table, move_to_dict
+from cpu_ai import SearchStats
+from repetition import PositionHistory, position_key
+
+EXPLORATION = math.sqrt(2)  # UCT exploration constant
+MAX_PLAYOUT_PLIES = 60  # A playout still undecided after this many moves is a draw
+DEFAULT_PLAYOUTS = 2000  # Playouts per move when neither budget is given
+POLICIES = ("light", "random")
+DRAW = 0.5
+WIN = 1.0
+
+
+class MCTSNode:
+    """A position in the search tree, reached by `move`; `side` is to move in it.
+
+    `wins` is the playout score of the player who made `move`: 1 per win and 0.5 per draw.
+    `terminal` holds that player's score when the game ends here, and is None otherwise.
+    """
+
+    __slots__ = ("move", "parent", "key", "side", "children", "untried", "visits", "wins", "terminal")
+
+    def __init__(self, move: Optional[int], parent: Optional["MCTSNode"], key: int, side: int) -> None:
+        self.move = move
+        self.parent = parent
+        self.key = key
+        self.side = side
+        self.children: list[MCTSNode] = []
+        self.untried: list[int] = []
+        self.visits = 0
+        self.wins = 0.0
+        self.terminal: Optional[float] = None
+
+    def repeats(self, key: int) -> bool:
+        """True when `key` occurs on the line from the root to this node."""
+        node = self
+        while node is not None:
+            if node.key == key:
+                return True
+            node = node.parent
+        return False
+
+    def best_child(self) -> Optional["MCTSNode"]:
+        """The most visited child, ties going to the higher score."""
+        return max(self.children, key=lambda child: (child.visits, child.wins), default=None)
+
+
+def playout(position: Position, side: int, rng: random.Random, light: bool = True,
+            max_plies: int = MAX_PLAYOUT_PLIES) -> int:
+    """Plays the game out in place with `side` to move and returns the winner (0 for a draw)."""
+    boards, has_line = position.boards, position.rules.has_line
+    for _ in range(max_plies):
+        moves = position.moves(side)
+        if not moves:
+            return 0
+        if light and position.patterns(side)[1]:  # With three in a row, look for the fourth
+            for move in moves:
+                undo = position.make_move(move, side)
+                if has_line(boards[side]):
+                    return side
+                position.unmake_move(undo, side)
+        position.make_move(moves[rng.randrange(len(moves))], side)
+        if has_line(boards[side]):
+            return side
+        side = 3 - side
+    return 0
+
+
+def _search_in_worker(green: int, red: int, rules: Rules, player: int, history_keys: list[int],
+                      time_limit: Optional[float], playouts: Optional[int], policy: str, batch_size: int,
+                      seed: int) -> dict[int, tuple[int, float]]:
+    """Runs in a pool worker: searches a fresh tree and returns its root move statistics."""
+    history = PositionHistory()
+    for key in history_keys:
+        history.push(key)
+    engine = MCTSEngine(policy=policy, batch_size=batch_size, seed=seed)
+    engine.search(Position(green, red, rules=rules), player, history, time_limit, playouts)
+    return engine.root_statistics()
+
+
+class MCTSEngine:
+    """UCT search whose tree is kept from one move to the next.
+
+    Use one engine per CPU player and game, like engine_session.EngineSession. Call `close`
+    when done with an engine that has `workers` > 1, to stop its worker processes.
+    """
+
+    def __init__(self, exploration: float = EXPLORATION, policy: str = "light", batch_size: int = 1,
+                 workers: int = 1, seed: Optional[int] = None) -> None:
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.exploration = exploration
+        self.light = policy == "light"
+        self.policy = policy
+        self.batch_size = max(1, batch_size)
+        self.workers = max(1, workers)
+        self.rng = random.Random(seed)
+        self.root: Optional[MCTSNode] = None
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.reused_playouts = 0  # Playouts the last search inherited from the one before
+        self.playouts = 0  # Playouts run by the last search, in this process and in workers
+        self.seconds = 0.0  # Duration of the last search
+
+    def __enter__(self) -> "MCTSEngine":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts the worker processes down, if any were started."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    @property
+    def playouts_per_second(self) -> float:
+        """Playout rate of the last search."""
+        return self.playouts / self.seconds if self.seconds else 0.0
+
+    def _new_node(self, move: Optional[int], parent: Optional[MCTSNode], position: Position, side: int,
+                  history: Optional[PositionHistory]) -> MCTSNode:
+        """Creates the node for `position` with `side` to move, marking it terminal when the game ends there."""
+        key = position_key(position, side)
+        node = MCTSNode(move, parent, key, side)
+        if position.rules.has_line(position.boards[3 - side]):
+            node.terminal = WIN
+        elif (history is not None and key in history) or (parent is not None and parent.repeats(key)):
+            node.terminal = DRAW
+        else:
+            node.untried = position.moves(side)
+            if not node.untried:
+                node.terminal = DRAW
+        return node
+
+    def _root_for(self, position: Position, player: int, history: Optional[PositionHistory]) -> MCTSNode:
+        """Returns the kept node for this position, looking two plies below the last root, or a new root."""
+        key = position_key(position, player)
+        candidates = []
+        if self.root is not None:
+            candidates.append(self.root)
+            candidates.extend(self.root.children)
+            candidates.extend(grandchild for child in self.root.children for grandchild in child.children)
+        for node in candidates:
+            if node.key == key and node.side == player and node.terminal is None:
+                node.parent = None
+                return node
+        return self._new_node(None, None, position, player, None)
+
+    def _select(self, node: MCTSNode) -> MCTSNode:
+        """The child with the highest upper confidence bound; a winning move is always chosen."""
+        scale = self.exploration * math.sqrt(math.log(node.visits))
+        return max(node.children, key=lambda child: math.inf if child.terminal == WIN else
+                   child.wins / child.visits + scale * math.sqrt(1 / child.visits))
+
+    def _pick_untried(self, node: MCTSNode, board: Position) -> int:
+        """Removes and returns the next move to expand: a winning move if there is one, else a random one."""
+        untried, side = node.untried, node.side
+        index = self.rng.randrange(len(untried))
+        if board.patterns(side)[1]:
+            for candidate, move in enumerate(untried):
+                undo = board.make_move(move, side)
+                wins = board.rules.has_line(board.boards[side])
+                board.unmake_move(undo, side)
+                if wins:
+                    index = candidate
+                    break
+        untried[index], untried[-1] = untried[-1], untried[index]
+        return untried.pop()
+
+    def _iterate(self, root: MCTSNode, position: Position, history: Optional[PositionHistory]) -> int:
+        """Runs one selection, expansion, playout and backup step; returns the playouts it credited."""
+        node, board = root, position.copy()
+        while node.terminal is None and not node.untried:
+            node = self._select(node)
+            board.make_move(node.move, 3 - node.side)
+
+        if node.terminal is None:
+            move, side = self._pick_untried(node, board), node.side
+            board.make_move(move, side)
+            child = self._new_node(move, node, board, 3 - side, history)
+            node.children.append(child)
+            node = child
+
+        # Score of the player who moved into `node`, summed over the batch
+        mover = 3 - node.side
+        if node.terminal is not None:
+            count, score = self.batch_size, node.terminal * self.batch_size
+        else:
+            count, score = self.batch_size, 0.0
+            for _ in range(self.batch_size):
+                winner = playout(board.copy(), node.side, self.rng, self.light)
+                score += WIN if winner == mover else DRAW if winner == 0 else 0.0
+
+        while node is not None:
+            node.visits += count
+            node.wins += score
+            score = count - score  # The parent was reached by the other player
+            node = node.parent
+        return count
+
+    def root_statistics(self) -> dict[int, tuple[int, float]]:
+        """Visits and score of every root move of the last search."""
+        if self.root is None:
+            return {}
+        return {child.move: (child.visits, child.wins) for child in self.root.children}
+
+    def search(self, position: Position, player: int, history: Optional[PositionHistory] = None,
+               time_limit: Optional[float] = None, playouts: Optional[int] = None,
+               stats: Optional[SearchStats] = None) -> Optional[int]:
+        """Searches `position` with `player` to move and returns the move code to play (None without moves).
+
+        Stops after `playouts` playouts or `time_limit` seconds, whichever comes first, or
+        after DEFAULT_PLAYOUTS playouts when neither is given. With workers, every process
+        gets the whole time limit and its share of the playouts.
+
+        `stats` counts every playout as a leaf evaluation at depth 0, and gets the length of the
+        most visited line as `completed_depth` and the chosen move's win rate (0 to 1) as `score`.
+        """
+        if time_limit is None and playouts is None:
+            playouts = DEFAULT_PLAYOUTS
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else None
+        root = self.root = self._root_for(position, player, history)
+        self.reused_playouts = root.visits
+
+        futures = []
+        if self.workers > 1:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(self.workers - 1, mp_context=multiprocessing.get_context("spawn"))
+            share = -(-playouts // self.workers) if playouts is not None else None
+            history_keys = list(history.keys) if history is not None else []
+            futures = [self.executor.submit(_search_in_worker, position.boards[1], position.boards[2], position.rules,
+                                            player, history_keys, time_limit, share, self.policy, self.batch_size,
+                                            self.rng.getrandbits(32))
+                       for _ in range(self.workers - 1)]
+            playouts = share
+
+        done = 0
+        while root.terminal is None and (root.untried or root.children):
+            if playouts is not None and done >= playouts:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            done += self._iterate(root, position, history)
+
+        totals = {child.move: [child.visits, child.wins] for child in root.children}
+        for future in futures:
+            for move, (visits, wins) in future.result().items():
+                done += visits
+                total = totals.setdefault(move, [0, 0.0])
+                total[0] += visits
+                total[1] += wins
+        self.playouts, self.seconds = done, time.perf_counter() - start
+        if not totals:
+            return None
+        best = max(totals, key=lambda move: tuple(totals[move]))
+        if stats is not None:
+            stats.nodes_by_depth[0] = stats.nodes_by_depth.get(0, 0) + done
+            stats.leaf_evaluations += done
+            stats.completed_depth = self.principal_depth()
+            stats.score = totals[best][1] / totals[best][0]
+        return best
+
+    def principal_depth(self) -> int:
+        """Length of the most visited line below the root."""
+        depth, node = 0, self.root
+        while node is not None and (node := node.best_child()) is not None:
+            depth += 1
+        return depth
+
+
+def ai_best_move_mcts(table: list[list[int]], player: int, time_limit: Optional[float] = None,
+                      playouts: Optional[int] = None, stats: Optional[SearchStats] = None,
+                      history: Optional[PositionHistory] = None, engine: Optional[MCTSEngine] = None,
+                      rules: Rules = DEFAULT_RULES) -> dict:
+    """Determines the AI's best move with Monte Carlo tree search.
+
+    `time_limit` (seconds) and `playouts` bound the search; without either it runs
+    DEFAULT_PLAYOUTS playouts. Pass an MCTSEngine to keep the tree between moves, or to choose
+    the playout policy, batch size or worker processes.
+    """
+    if engine is None:
+        engine = MCTSEngine()
+    return move_to_dict(engine.search(from_table(table, rules), player, history, time_limit, playouts, stats), rules)
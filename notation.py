@@ -0,0 +1,58 @@
+"""Compact text notation for a game table and the side to move.
+
+Rows are written top to bottom and joined by '/'. In a row, 'G' is a green piece (player 1),
+'R' a red piece (player 2), and a run of empty squares is either its length as a number or
+one '.' per square. After a space comes the side to move, 'g' or 'r':
+
+    G1RG1R/6/R4G/G4R/6/R1GR1G g     # the starting position, green to move
+    G.RG.R/....../R....G/G....R/....../R.GR.G g
+
+The board size is the number of rows, so the same notation covers larger variants.
+"""
+from typing import List
+
+PIECES = {"G": 1, "R": 2}
+SIDES = {"g": 1, "r": 2}
+
+
+def to_notation(table: List[List[int]], side_to_move: int) -> str:
+    """Writes a table and the side to move, with empty runs as numbers."""
+    rows = []
+    for row in table:
+        text, empty = "", 0
+        for cell in row:
+            if cell == 0:
+                empty += 1
+                continue
+            if empty:
+                text, empty = text + str(empty), 0
+            text += "GR"[cell - 1]
+        rows.append(text + (str(empty) if empty else ""))
+    return "/".join(rows) + " " + "gr"[side_to_move - 1]
+
+
+def parse_notation(text: str) -> tuple[List[List[int]], int]:
+    """Reads a position written in the notation; raises ValueError when it is malformed."""
+    fields = text.split()
+    if len(fields) != 2 or fields[1] not in SIDES:
+        raise ValueError("expected '<rows> <g|r>'")
+    table = []
+    for row_text in fields[0].split("/"):
+        row, number = [], ""
+        for char in row_text + " ":  # The trailing space flushes a final number
+            if char.isdigit():
+                number += char
+                continue
+            if number:
+                row.extend([0] * int(number))
+                number = ""
+            if char == ".":
+                row.append(0)
+            elif char in PIECES:
+                row.append(PIECES[char])
+            elif char != " ":
+                raise ValueError(f"unexpected character {char!r}")
+        table.append(row)
+    if any(len(row) != len(table) for row in table):
+        raise ValueError(f"the board must be square; got {len(table)} rows of lengths {[len(row) for row in table]}")
+    return table, SIDES[fields[1]]
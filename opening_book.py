@@ -0,0 +1,97 @@
+"""Opening book lookups through a memory-mapped file.
+
+The book is a header followed by fixed-size records sorted by canonical position key (see
+symmetry.canonical_key). Each record holds the key, the best move in the canonical frame
+and its score for the side to move. Lookups binary-search the mapped file directly, so only
+the pages touched are read into memory. Books are written by build_opening_book.py.
+"""
+import mmap
+import struct
+from pathlib import Path
+from typing import Optional
+from bitboard import NUM_SQUARES, Position
+from symmetry import canonical_key, from_canonical_move
+
+MAGIC = b"CRABBOOK"
+VERSION = 1
+HEADER = struct.Struct(">8sII")  # magic, version, record count
+KEY_BYTES = (2 * NUM_SQUARES + 7) // 8
+RECORD = struct.Struct(f">{KEY_BYTES}sBh")  # canonical key, canonical move code, score
+
+DEFAULT_BOOK_PATH = Path(__file__).with_name("opening_book.bin")
+
+
+def pack_record(key: int, move: int, score: int) -> bytes:
+    """Encodes one book record; big-endian keys sort bytewise in numeric order."""
+    return RECORD.pack(key.to_bytes(KEY_BYTES, "big"), move, score)
+
+
+def write_book(path: Path, entries: dict[int, tuple[int, int]]) -> None:
+    """Writes a book file from a {canonical key: (canonical move, score)} mapping."""
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+        for key in sorted(entries):
+            file.write(pack_record(key, *entries[key]))
+
+
+class OpeningBook:
+    """Read-only, memory-mapped opening book."""
+
+    def __init__(self, path: Path = DEFAULT_BOOK_PATH) -> None:
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Unmaps and closes the book file."""
+        self.data.close()
+        self.file.close()
+
+    def probe(self, key: int) -> Optional[tuple[int, int]]:
+        """Returns the (canonical move, score) stored for a canonical key, or None."""
+        target = key.to_bytes(KEY_BYTES, "big")
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            offset = HEADER.size + middle * RECORD.size
+            record_key = self.data[offset:offset + KEY_BYTES]
+            if record_key < target:
+                low = middle + 1
+            elif record_key > target:
+                high = middle
+            else:
+                _, move, score = RECORD.unpack_from(self.data, offset)
+                return move, score
+        return None
+
+    def lookup(self, position: Position, player: int) -> Optional[tuple[int, int]]:
+        """Returns (move code, score) for `player` to move in `position`, or None if not in the book."""
+        key, symmetry = canonical_key(position, player)
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        move, score = entry
+        return from_canonical_move(move, symmetry), score
+
+
+_default_book: Optional[OpeningBook] = None
+
+
+def default_book() -> Optional[OpeningBook]:
+    """Opens the book at DEFAULT_BOOK_PATH once; returns None if there is no book file."""
+    global _default_book
+    if _default_book is None and DEFAULT_BOOK_PATH.exists():
+        _default_book = OpeningBook(DEFAULT_BOOK_PATH)
+    return _default_book
@@ -0,0 +1,154 @@
+"""Root-parallel search for the hard CPU player.
+
+Root moves are handed out one at a time to a pool of worker processes. Each worker searches
+its move with the best score found so far by any worker as a shared alpha bound.
+Children that can't beat that bound are cut off early.
+"""
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from bitboard import Position, from_table, move_to_dict
+from cpu_ai import MoveOrdering, default_hard_depth, minimax_hard
+from transposition import DEFAULT_SIZE, TranspositionTable
+from utils import create_initial_table, move_piece
+
+NO_SCORE = -(1 << 40)  # Shared alpha before any root move has been scored
+
+# Per-process worker state, set up by _init_worker
+_shared_alpha = None
+_worker_tt: Optional[TranspositionTable] = None
+_worker_search_id = None
+_worker_tt_size = DEFAULT_SIZE
+
+
+def _init_worker(shared_alpha, tt_size: int) -> None:
+    """Stores the shared alpha bound and table size in a newly started worker process."""
+    global _shared_alpha, _worker_tt_size
+    _shared_alpha = shared_alpha
+    _worker_tt_size = tt_size
+
+
+def _search_root_move(search_id: int, green: int, red: int, player: int, move: int,
+                      depth: int, max_depth: int) -> int:
+    """Searches one root move in a worker and publishes its score if it beats the shared alpha."""
+    global _worker_tt, _worker_search_id
+    # Table scores are relative to the searching player, so never reuse one across searches
+    if _worker_search_id != search_id:
+        _worker_tt, _worker_search_id = TranspositionTable(_worker_tt_size), search_id
+
+    position = Position(green, red)
+    position.make_move(move, player)
+    # Search one below the shared bound so that a move tying the current best still gets an
+    # exact score; ties are then broken by root order, exactly like the serial search.
+    alpha = _shared_alpha.value - 1 if _shared_alpha.value != NO_SCORE else -math.inf
+    score, _ = minimax_hard(position, depth, alpha, math.inf, False, player, max_depth, tt=_worker_tt)
+
+    with _shared_alpha.get_lock():
+        # An opponent left without moves scores +inf, which the shared integer cannot hold
+        if score > _shared_alpha.value and score != math.inf:
+            _shared_alpha.value = score
+    return score
+
+
+class ParallelSearcher:
+    """Pool of worker processes that search the root moves of a position in parallel.
+
+    For a given depth it returns the same move as `minimax_hard` run serially at that depth
+    with a fresh transposition table.
+    """
+
+    def __init__(self, workers: Optional[int] = None, tt_size: int = DEFAULT_SIZE) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.shared_alpha = multiprocessing.Value('q', NO_SCORE)
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.shared_alpha, tt_size))
+        self.search_id = 0
+
+    def __enter__(self) -> "ParallelSearcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shuts the worker processes down."""
+        self.executor.shutdown()
+
+    def search(self, position: Position, player: int, depth: int) -> tuple[int, Optional[int]]:
+        """Returns the (score, move code) chosen by a depth-`depth` search."""
+        max_depth = depth + 2
+        pieces = position.piece_moves(player)
+        if position.winner() or not pieces:
+            return 0, None
+
+        # Same root order and depth extension as minimax_hard
+        root_moves = MoveOrdering().order([move for _, moves in pieces for move in moves], player, 0)
+        child_depth = depth if len(pieces) < 3 and depth < max_depth else depth - 1
+
+        self.search_id += 1
+        self.shared_alpha.value = NO_SCORE
+        futures = [
+            self.executor.submit(_search_root_move, self.search_id, position.boards[1], position.boards[2],
+                                 player, move, child_depth, max_depth)
+            for move in root_moves
+        ]
+        scores = [future.result() for future in futures]
+
+        # Root moves that failed low returned an upper bound below the best score, so the
+        # first move reaching the maximum is the serial search's choice.
+        best_score = max(scores)
+        return best_score, root_moves[scores.index(best_score)]
+
+
+def ai_best_move_parallel(table: list[list[int]], player: int, workers: Optional[int] = None,
+                          depth: Optional[int] = None, searcher: Optional[ParallelSearcher] = None) -> dict:
+    """Determines the hard CPU's move with a root-parallel search.
+
+    `depth` defaults to the hard CPU's fixed depth. Pass a `searcher` to reuse its worker pool
+    between moves; otherwise a pool of `workers` processes is started for this call.
+    """
+    position = from_table(table)
+    if depth is None:
+        depth = default_hard_depth(position)
+    if searcher is not None:
+        return move_to_dict(searcher.search(position, player, depth)[1])
+    with ParallelSearcher(workers) as searcher:
+        return move_to_dict(searcher.search(position, player, depth)[1])
+
+
+def _benchmark_positions() -> list[tuple[list[list[int]], int]]:
+    """Builds a small fixed set of (table, player to move) positions for the scaling benchmark."""
+    opening = create_initial_table()
+    middle = create_initial_table()
+    for row, col, vertical, horizontal, player in ((0, 0, 1, 0, 1), (0, 2, 1, 0, 2), (5, 2, -1, 0, 1),
+                                                    (5, 3, -1, 0, 2), (2, 5, 0, -1, 1), (3, 5, 0, -1, 2)):
+        move_piece(middle, {'row': row, 'col': col}, {'vertical': vertical, 'horizontal': horizontal}, player)
+    return [(opening, 1), (middle, 1), (middle, 2)]
+
+
+def run_benchmark(depth: int, worker_counts: tuple[int, ...]) -> None:
+    """Prints wall-clock time and speedup of the root-parallel search for each worker count."""
+    positions = _benchmark_positions()
+    baseline = None
+    print(f"depth {depth}, {len(positions)} positions, {os.cpu_count()} CPUs")
+    for workers in worker_counts:
+        with ParallelSearcher(workers) as searcher:
+            searcher.search(from_table(positions[0][0]), positions[0][1], 1)  # Warm the workers up
+            start = time.perf_counter()
+            for table, player in positions:
+                searcher.search(from_table(table), player, depth)
+            elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers} workers: {elapsed:.2f}s  speedup x{baseline / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Root-parallel search scaling benchmark")
+    parser.add_argument("--depth", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    run_benchmark(args.depth, tuple(args.workers))
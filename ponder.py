@@ -0,0 +1,91 @@
+"""Pondering: searching on the opponent's time.
+
+While the human player is choosing a move, a background thread guesses their replies and
+searches the CPU's answer to each one. The replies are ranked with a one-ply evaluation,
+and every reply is searched one depth deeper per round, most likely replies first, so the
+likely ones are always the furthest along. Once the human has moved, `stop` cancels the
+thread and `results` and `tt` are handed to ai_best_move_hard, which plays a finished
+result at once or carries on deepening from it.
+"""
+import math
+import threading
+import time
+from typing import Optional
+from bitboard import Position, from_table
+from cpu_ai import (
+    MAX_SEARCH_DEPTH, WEIGHTS, MoveOrdering, SearchLimits, SearchTimeout, evaluate_board_hard, minimax_hard
+)
+from repetition import PositionHistory, position_key
+from transposition import TranspositionTable
+
+
+class Ponderer:
+    """Background search of the CPU's answers to each of the opponent's possible moves.
+
+    `results` maps position_key(position after the reply, CPU) to
+    (best move, completed depth, score, seconds searched).
+    """
+
+    def __init__(self, tt: Optional[TranspositionTable] = None, ordering: Optional[MoveOrdering] = None) -> None:
+        self.tt = tt if tt is not None else TranspositionTable()
+        self.ordering = ordering if ordering is not None else MoveOrdering()
+        self.results: dict[int, tuple[int, int, int, float]] = {}
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self, table: list[list[int]], player: int, history: Optional[PositionHistory] = None) -> None:
+        """Starts pondering `player`'s answers while the opponent is to move on `table`.
+
+        The table and history are copied, so the caller may keep using them.
+        """
+        self.stop()
+        self.results = {}
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self._run, args=(from_table(table), player, history.copy() if history is not None else None),
+            name="ponder", daemon=True,
+        )
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Cancels pondering and waits for the thread to finish; the results are kept."""
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def _likely_replies(self, position: Position, opponent: int) -> list[Position]:
+        """Positions after each opponent move that does not win at once, best for them first."""
+        replies = [position.play(move, opponent) for move in position.moves(opponent)]
+        replies = [reply for reply in replies if not reply.winner()]
+        replies.sort(key=lambda reply: evaluate_board_hard(reply, opponent), reverse=True)
+        return replies
+
+    def _run(self, position: Position, player: int, history: Optional[PositionHistory]) -> None:
+        """Thread body: deepens every reply by one ply per round until stopped or done."""
+        limits = SearchLimits(stop=self.stop_event)
+        replies = self._likely_replies(position, 3 - player)
+        history_length = len(history) if history is not None else 0
+        for depth in range(1, MAX_SEARCH_DEPTH + 1):
+            pending = False
+            for reply in replies:
+                key = position_key(reply, player)
+                _, _, score, seconds = self.results.get(key, (None, 0, 0, 0.0))
+                if abs(score) >= WEIGHTS['win']:  # Already forced, deeper search cannot change it
+                    continue
+                pending = True
+                if history is not None:
+                    history.push(key)
+                start = time.perf_counter()
+                try:
+                    score, move = minimax_hard(reply, depth, -math.inf, math.inf, True, player, depth + 2,
+                                               tt=self.tt, limits=limits, ordering=self.ordering, history=history)
+                except SearchTimeout:
+                    return
+                finally:
+                    if history is not None:
+                        history.truncate(history_length)
+                if move is not None:
+                    self.results[key] = (move, depth, score, seconds + time.perf_counter() - start)
+            if not pending:
+                return
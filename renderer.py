@@ -0,0 +1,51 @@
+"""Flicker-free terminal drawing of the game table.
+
+The first frame clears the screen and writes the whole table. Later frames only rewrite
+the cells that changed, moving the cursor there with ANSI escapes, then clear the text
+below the table. Every frame is sent to the terminal with a single write.
+"""
+import sys
+from typing import List, Optional, TextIO
+from utils import CLEAR_SCREEN, TABLE_SIZE, draw_square, format_table
+
+CLEAR_BELOW = "\x1b[J"  # ANSI: erase from the cursor to the end of the screen
+HEADER_LINES = 1  # Column letters above the first row
+ROW_LABEL_WIDTH = 2  # Row number and a space before the first cell
+CELL_WIDTH = 2  # Emoji squares take two terminal columns
+TEXT_LINE = HEADER_LINES + TABLE_SIZE + 3  # First line below the table, after draw_table's separator
+
+
+def move_cursor(line: int, column: int) -> str:
+    """ANSI escape moving the cursor to a 1-based screen position."""
+    return f"\x1b[{line};{column}H"
+
+
+class BoardRenderer:
+    """Draws the table at the top of the terminal, rewriting only the cells that changed."""
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self.stream = stream or sys.stdout
+        self.cells: Optional[List[List[str]]] = None  # What the screen shows now; None if unknown
+
+    def invalidate(self) -> None:
+        """Forgets the screen contents, so the next frame is drawn in full."""
+        self.cells = None
+
+    def frame(self, table: List[List[int]], highlight_pos: Optional[tuple[int, int]] = None) -> str:
+        """Returns the output that turns the current screen into `table`, and records it as shown."""
+        cells = [[draw_square(table[row][col], highlight=(row, col) == highlight_pos) for col in range(TABLE_SIZE)]
+                 for row in range(TABLE_SIZE)]
+        if self.cells is None:
+            parts = [CLEAR_SCREEN, format_table(table, highlight_pos)]
+        else:
+            parts = [move_cursor(HEADER_LINES + row + 1, ROW_LABEL_WIDTH + CELL_WIDTH * col + 1) + cells[row][col]
+                     for row in range(TABLE_SIZE) for col in range(TABLE_SIZE)
+                     if cells[row][col] != self.cells[row][col]]
+        parts.append(move_cursor(TEXT_LINE, 1) + CLEAR_BELOW)
+        self.cells = cells
+        return "".join(parts)
+
+    def draw(self, table: List[List[int]], highlight_pos: Optional[tuple[int, int]] = None) -> None:
+        """Brings the screen up to date with `table` and leaves the cursor below it."""
+        self.stream.write(self.frame(table, highlight_pos))
+        self.stream.flush()
@@ -0,0 +1,75 @@
+"""Position history for repetition detection.
+
+Pieces slide back and forth, so games can cycle forever. A PositionHistory is a stack of
+position keys (Zobrist hash of the board and the side to move) shared by the game loop and
+the search: the game loop pushes every position actually played, and the search pushes the
+positions along the line it is exploring, so a line that returns to any of them is a cycle.
+"""
+from typing import List, Optional
+from bitboard import Position, from_table
+
+REPETITION_LIMIT = 3  # A game is drawn when a position occurs this many times
+
+
+def position_key(position: Position, side_to_move: int) -> int:
+    """Key of a position with `side_to_move` to play."""
+    return position.hash ^ position.rules.side_keys[side_to_move]
+
+
+def table_key(table: List[List[int]], side_to_move: int) -> int:
+    """`position_key` for a list-of-lists game table."""
+    return position_key(from_table(table), side_to_move)
+
+
+class PositionHistory:
+    """Stack of position keys with an occurrence count per key."""
+
+    __slots__ = ("keys", "counts")
+
+    def __init__(self) -> None:
+        self.keys: list[int] = []
+        self.counts: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self.counts
+
+    def push(self, key: int) -> int:
+        """Adds a position and returns how many times it has now occurred."""
+        self.keys.append(key)
+        count = self.counts[key] = self.counts.get(key, 0) + 1
+        return count
+
+    def record_turn(self, table: List[List[int]], side_to_move: int, limit: Optional[int] = REPETITION_LIMIT) -> bool:
+        """Pushes a position a game reached, after a move or a pass; True when it draws by repetition.
+
+        The game is drawn once the position has occurred `limit` times; a `limit` of None never draws.
+        """
+        repetitions = self.push(table_key(table, side_to_move))
+        return limit is not None and repetitions >= limit
+
+    def pop(self) -> int:
+        """Removes and returns the most recent position."""
+        key = self.keys.pop()
+        if self.counts[key] == 1:
+            del self.counts[key]
+        else:
+            self.counts[key] -= 1
+        return key
+
+    def truncate(self, length: int) -> None:
+        """Pops positions until only the first `length` remain."""
+        while len(self.keys) > length:
+            self.pop()
+
+    def copy(self) -> "PositionHistory":
+        """Returns an independent copy of the history."""
+        history = PositionHistory()
+        history.keys, history.counts = list(self.keys), dict(self.counts)
+        return history
+
+    def count(self, key: int) -> int:
+        """Number of times a position occurs in the history."""
+        return self.counts.get(key, 0)
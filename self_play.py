@@ -0,0 +1,180 @@
+"""Headless self-play runner.
+
+Plays many CPU-vs-CPU games without any drawing or animation, spreads them over worker
+processes and streams one JSON line per finished game.
+
+    python self_play.py --games 1000 --player1 normal --player2 hard --output results.jsonl
+
+To compare engines at equal think time, give both the same budget:
+
+    python self_play.py --games 200 --player1 mcts:0.5 --player2 hard:0.5
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from multiprocessing import Pool
+from typing import Callable, Optional
+from cpu_ai import ai_best_move_normal
+from bitboard import move_from_dict
+from engine_session import EngineSession
+from game_record import PASS, GameRecord, GameRecordWriter
+from repetition import REPETITION_LIMIT, PositionHistory, table_key
+from utils import check_winner, choose_first_player, create_initial_table, get_available_squares, move_piece
+
+Engine = Callable[[list[list[int]], int, PositionHistory], dict]
+ENGINE_LEVELS = {"hard": 2, "mcts": 3}  # Engine spec names played by an EngineSession of this difficulty
+
+
+def make_engine(spec: str) -> Engine:
+    """Builds a move function from an engine spec.
+
+    Specs are "normal", "hard" (fixed depth), "hard:<seconds>" (time-budgeted hard search),
+    "mcts" (fixed number of playouts) or "mcts:<seconds>" (time-budgeted Monte Carlo search).
+    Hard and MCTS engines keep their search state between moves, so build a new engine for
+    every game.
+    """
+    name, _, argument = spec.partition(":")
+    if name == "normal" and not argument:
+        return lambda table, player, history: ai_best_move_normal(table, player, history=history)
+    if name in ENGINE_LEVELS:
+        difficult, time_limit = ENGINE_LEVELS[name], float(argument) if argument else None
+        sessions: dict[int, EngineSession] = {}
+
+        def session_engine(table: list[list[int]], player: int, history: PositionHistory) -> dict:
+            if player not in sessions:
+                sessions[player] = EngineSession(player, difficult, time_limit)
+            return sessions[player].best_move(table, history)
+
+        return session_engine
+    raise ValueError(f"Unknown engine spec: {spec!r}")
+
+
+def play_game(game: int, engines: tuple[str, str], seed: int, max_plies: int, random_plies: int,
+              repetition_limit: Optional[int] = REPETITION_LIMIT) -> dict:
+    """Plays one headless game and returns its result record.
+
+    `engines[0]` plays as player 1 and `engines[1]` as player 2. The game's random generator,
+    seeded with `seed`, picks the first player and the first `random_plies` moves, so that
+    games between deterministic engines differ from each other. A game still undecided after
+    `max_plies` moves, or in which a position occurs `repetition_limit` times, is recorded as a
+    draw (winner 0) and its `draw_reason` says which. `moves` holds the game's move codes, and
+    PASS where the side to move had no legal move.
+    """
+    rng = random.Random(seed)
+    move_functions = (None, make_engine(engines[0]), make_engine(engines[1]))
+    table, current_player = create_initial_table(), choose_first_player(rng)
+    first_player, winner, plies, think_times, moves = current_player, 0, 0, [], bytearray()
+    history, draw_reason = PositionHistory(), None
+    history.push(table_key(table, current_player))
+
+    while True:
+        if plies >= max_plies:
+            draw_reason = "move_limit"
+            break
+        if plies < random_plies:
+            squares, move = get_available_squares(table, current_player), {}
+            if squares:
+                square = rng.choice(squares)
+                move = {'piece': square['square_position'], 'direction': rng.choice(square['available_moves'])}
+        else:
+            start = time.perf_counter()
+            move = move_functions[current_player](table, current_player, history)
+            think_times.append(round(time.perf_counter() - start, 6))
+        if move:
+            move_piece(table, move['piece'], move['direction'], current_player)
+            moves.append(move_from_dict(move))
+        else:  # No piece can move: pass, as in the interactive game
+            moves.append(PASS)
+        plies += 1
+
+        if (winner := check_winner(table)):
+            break
+
+        current_player = 3 - current_player  # Switch between 1 and 2
+        if history.record_turn(table, current_player, repetition_limit):
+            draw_reason = "repetition"
+            break
+
+    return {
+        "game": game,
+        "seed": seed,
+        "player1": engines[0],
+        "player2": engines[1],
+        "first_player": first_player,
+        "winner": winner,
+        "draw_reason": draw_reason,
+        "plies": plies,
+        "think_times": think_times,
+        "moves": bytes(moves),
+    }
+
+
+def _play_game_task(arguments: tuple) -> dict:
+    """Unpacks a task tuple for Pool.imap_unordered."""
+    return play_game(*arguments)
+
+
+def run_self_play(games: int, engines: tuple[str, str], workers: int, seed: int, max_plies: int,
+                  random_plies: int, output, repetition_limit: Optional[int] = REPETITION_LIMIT,
+                  recorder: Optional[GameRecordWriter] = None) -> dict:
+    """Plays `games` games across `workers` processes, writing each result to `output` as JSONL.
+
+    With a `recorder`, every game's moves are also appended to its binary record file.
+    Returns the summary: wins per engine, draws, and throughput.
+    """
+    tasks = ((game, engines, seed + game, max_plies, random_plies, repetition_limit) for game in range(games))
+    wins, start = [0, 0, 0], time.perf_counter()
+    with Pool(workers) as pool:
+        for result in pool.imap_unordered(_play_game_task, tasks):
+            moves = result.pop("moves")
+            if recorder is not None:
+                recorder.write(GameRecord(result["first_player"], result["winner"], moves))
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            wins[result["winner"]] += 1
+    elapsed = time.perf_counter() - start
+    return {
+        "games": games,
+        "player1": engines[0],
+        "player2": engines[1],
+        "player1_win_rate": wins[1] / games if games else 0.0,
+        "player2_win_rate": wins[2] / games if games else 0.0,
+        "draw_rate": wins[0] / games if games else 0.0,
+        "seconds": round(elapsed, 3),
+        "games_per_second": round(games / elapsed, 3) if elapsed else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Play headless CPU-vs-CPU games")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--player1", default="normal",
+                        help='engine spec: "normal", "hard[:<seconds>]" or "mcts[:<seconds>]"')
+    parser.add_argument("--player2", default="hard",
+                        help='engine spec: "normal", "hard[:<seconds>]" or "mcts[:<seconds>]"')
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game; game N uses seed + N")
+    parser.add_argument("--max-plies", type=int, default=200, help="moves after which a game is a draw")
+    parser.add_argument("--repetitions", type=int, default=REPETITION_LIMIT,
+                        help="occurrences of a position that draw the game (0 to disable)")
+    parser.add_argument("--random-plies", type=int, default=2, help="random opening moves per game")
+    parser.add_argument("--output", default="-", help='JSONL results file ("-" for stdout)')
+    parser.add_argument("--record", help="also append every game to this binary game record file")
+    args = parser.parse_args()
+
+    for spec in (args.player1, args.player2):
+        make_engine(spec)  # Fail before starting any worker
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w")
+    recorder = GameRecordWriter(args.record) if args.record else None
+    try:
+        summary = run_self_play(args.games, (args.player1, args.player2), args.workers, args.seed,
+                                args.max_plies, args.random_plies, output, args.repetitions or None, recorder)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if recorder is not None:
+            recorder.close()
+    print(json.dumps(summary), file=sys.stderr)
@@ -0,0 +1,301 @@
+"""Multi-game TCP server.
+
+Hosts many independent games over a line-delimited JSON protocol: every request is one
+JSON object on one line, and every request gets exactly one JSON line back. Requests may
+carry an "id", which is echoed in the reply.
+
+    {"op": "new", "mode": "cpu", "difficult": 2, "time_limit": 1.0, "clock": 60}
+    {"op": "move", "game": 1, "piece": {"row": 0, "col": 0}, "direction": {"vertical": 1, "horizontal": 0}}
+    {"op": "state", "game": 1}
+    {"op": "close", "game": 1}
+
+A game lasts until it is closed or the connection that created it disconnects.
+
+In "cpu" games the human plays green (1) and the CPU red (2); in "pvp" games both sides
+send moves. A side with no piece that can move passes by sending a move without "piece".
+CPU moves run in a bounded process pool, so a long search never blocks the event loop or
+other games. When every worker is busy and the wait queue is full, requests that need the
+CPU are answered at once with {"ok": false, "error": "busy"} and can be retried.
+`time_limit` caps each CPU move and `clock` is the CPU's total thinking time for the game;
+each move gets at most 1/MOVES_TO_GO of what is left on the clock.
+
+    python server.py --port 8765 --workers 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from cpu_ai import ai_best_move_hard, ai_best_move_normal
+from mcts import ai_best_move_mcts
+from repetition import PositionHistory, table_key
+from utils import check_winner, choose_first_player, create_initial_table, get_available_squares, move_piece
+
+DEFAULT_PORT = 8765
+DEFAULT_TIME_LIMIT = 1.0  # Seconds per CPU move when the client does not ask for one
+MAX_TIME_LIMIT = 10.0  # Longest CPU move a client may ask for
+MOVES_TO_GO = 20  # A clocked CPU move may use this fraction of the remaining clock
+CPU_PLAYER = 2
+
+
+class RequestError(Exception):
+    """A request the server cannot carry out; its message is sent back to the client."""
+
+
+def number_field(request: dict, name: str, default: Optional[float]) -> Optional[float]:
+    """A non-negative number from a request, or `default` when the field is missing or null."""
+    value = request.get(name)
+    if value is None:
+        return default
+    if type(value) not in (int, float) or not 0 <= value < math.inf:
+        raise RequestError(f"{name} must be a non-negative number")
+    return float(value)
+
+
+def cpu_move(table: list[list[int]], player: int, difficult: int, time_limit: float,
+             history_keys: list[int]) -> tuple[dict, float]:
+    """Runs in a pool worker: chooses the CPU's move and returns it with the seconds spent searching."""
+    start = time.perf_counter()
+    history = PositionHistory()
+    for key in history_keys:
+        history.push(key)
+    if difficult == 1:
+        move = ai_best_move_normal(table, player, history=history)
+    elif difficult == 3:
+        move = ai_best_move_mcts(table, player, time_limit=time_limit, history=history)
+    else:
+        move = ai_best_move_hard(table, player, time_limit=time_limit, history=history)
+    return move, time.perf_counter() - start
+
+
+class Game:
+    """State of one hosted game."""
+
+    def __init__(self, game_id: int, mode: str, difficult: int, time_limit: float, clock: Optional[float]) -> None:
+        self.game_id = game_id
+        self.mode = mode
+        self.difficult = difficult
+        self.time_limit = time_limit
+        self.clock = clock  # CPU thinking time left, or None for no clock
+        self.table = create_initial_table()
+        self.to_move = choose_first_player()
+        self.winner = 0
+        self.draw = False
+        self.history = PositionHistory()
+        self.history.push(table_key(self.table, self.to_move))
+        self.lock = asyncio.Lock()  # One move at a time, even from several connections
+
+    @property
+    def over(self) -> bool:
+        """True once the game is won or drawn."""
+        return bool(self.winner) or self.draw
+
+    def cpu_to_move(self) -> bool:
+        """True when the server has to play the next move."""
+        return self.mode == "cpu" and not self.over and self.to_move == CPU_PLAYER
+
+    def move_budget(self) -> float:
+        """Thinking time for the next CPU move under the game's time controls."""
+        if self.clock is None:
+            return self.time_limit
+        return max(0.0, min(self.time_limit, self.clock / MOVES_TO_GO))
+
+    def play(self, move: dict) -> None:
+        """Applies a move for the side to move, then updates the result and the repetition history.
+
+        A side with no piece that can move passes, and its move carries no piece.
+        """
+        squares = get_available_squares(self.table, self.to_move)
+        if squares or move.get('piece') is not None:
+            square = next((square for square in squares if square['square_position'] == move.get('piece')), None)
+            if square is None or move.get('direction') not in square['available_moves']:
+                raise RequestError("illegal move")
+            move_piece(self.table, square['square_position'], move['direction'], self.to_move)
+            self.winner = check_winner(self.table)
+        self.to_move = 3 - self.to_move
+        if not self.winner and self.history.record_turn(self.table, self.to_move):
+            self.draw = True
+
+    def save(self) -> tuple:
+        """The state a failed request is rolled back to with `restore`."""
+        return [row[:] for row in self.table], self.to_move, self.winner, self.draw, len(self.history)
+
+    def restore(self, saved: tuple) -> None:
+        """Returns to a state taken by `save`."""
+        table, self.to_move, self.winner, self.draw, length = saved
+        self.table = [row[:] for row in table]
+        self.history.truncate(length)
+
+    def state(self) -> dict:
+        """The game fields sent back with every reply about this game."""
+        return {"game": self.game_id, "table": self.table, "to_move": self.to_move, "winner": self.winner,
+                "draw": self.draw, "clock": self.clock}
+
+
+class GameServer:
+    """Serves games to any number of connections, with CPU moves in a shared process pool."""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None) -> None:
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = self.start_pool()
+        # CPU moves running or waiting for a worker; beyond this the server answers "busy"
+        self.slots = self.workers + (max_pending if max_pending is not None else self.workers)
+        self.pending = 0
+        self.connections = 0
+        self.games: dict[int, Game] = {}
+        self.game_ids = itertools.count(1)
+
+    def start_pool(self) -> ProcessPoolExecutor:
+        """Starts the CPU worker pool."""
+        # Forked workers would inherit the event loop and open client sockets, so start fresh interpreters
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def close(self) -> None:
+        """Shuts the worker pool down, dropping queued CPU moves."""
+        self.executor.shutdown(cancel_futures=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answers one connection's requests in order until it disconnects, then drops the games it created."""
+        self.connections += 1
+        created: set[int] = set()
+        try:
+            while line := await reader.readline():
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        request = {}
+                        raise RequestError("requests must be JSON objects")
+                    reply = {"ok": True, **await self.dispatch(request)}
+                    if request.get("op") == "new":
+                        created.add(reply["game"])
+                except (RequestError, ValueError) as error:
+                    reply = {"ok": False, "error": str(error)}
+                except Exception as error:  # A bug must still not leave the request without a reply
+                    reply = {"ok": False, "error": f"internal error: {error!r}"}
+                if "id" in request:
+                    reply["id"] = request["id"]
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()  # Stop reading while a slow client is not reading its replies
+        except ConnectionError:
+            pass
+        finally:
+            self.connections -= 1
+            for game_id in created:
+                self.games.pop(game_id, None)
+            writer.close()
+
+    async def dispatch(self, request: dict) -> dict:
+        """Runs one request and returns the fields of its reply."""
+        op = request.get("op")
+        if op == "new":
+            return await self.new_game(request)
+        game_id = request.get("game")
+        game = self.games.get(game_id) if type(game_id) is int else None
+        if game is None:
+            raise RequestError("unknown game")
+        if op == "state":
+            return game.state()
+        if op == "close":
+            del self.games[game.game_id]
+            return {"game": game.game_id}
+        if op == "move":
+            async with game.lock:
+                if game.over:
+                    raise RequestError("game is over")
+                if game.cpu_to_move():
+                    raise RequestError("not your turn")
+                if game.mode == "pvp":
+                    game.play(request)
+                    return game.state()
+                self.reserve_slot()  # Before the move is played, so a refused request changes nothing
+                saved = game.save()
+                try:
+                    game.play(request)
+                    return await self.reply_as_cpu(game)
+                except RequestError:
+                    game.restore(saved)  # Also when the CPU failed, so that the move can be sent again
+                    raise
+                finally:
+                    self.pending -= 1
+        raise RequestError(f"unknown op {op!r}")
+
+    async def new_game(self, request: dict) -> dict:
+        """Creates a game, playing the CPU's first move if it starts."""
+        mode = request.get("mode", "cpu")
+        difficult = request.get("difficult", 2)
+        if mode not in ("cpu", "pvp") or type(difficult) is not int or difficult not in (1, 2, 3):
+            raise RequestError("mode must be 'cpu' or 'pvp' and difficult 1, 2 or 3")
+        time_limit = min(number_field(request, "time_limit", DEFAULT_TIME_LIMIT), MAX_TIME_LIMIT)
+        clock = number_field(request, "clock", None)
+        game = Game(next(self.game_ids), mode, difficult, time_limit, clock)
+        if game.cpu_to_move():
+            # The game is only registered once the CPU's first move is played, so a refused request leaves nothing
+            self.reserve_slot()
+            try:
+                reply = await self.reply_as_cpu(game)
+            finally:
+                self.pending -= 1
+        else:
+            reply = game.state()
+        self.games[game.game_id] = game
+        return reply
+
+    def reserve_slot(self) -> None:
+        """Claims a CPU slot, or refuses the request when the pool and its queue are full."""
+        if self.pending >= self.slots:
+            raise RequestError("busy")
+        self.pending += 1
+
+    async def reply_as_cpu(self, game: Game) -> dict:
+        """Plays the CPU's move if it is the CPU's turn and returns the game state after it."""
+        if not game.cpu_to_move():
+            return game.state()
+        # The clock is charged with the search time only, not the wait for a free worker
+        executor = self.executor
+        try:
+            move, think_time = await asyncio.get_running_loop().run_in_executor(
+                executor, cpu_move, [row[:] for row in game.table], CPU_PLAYER, game.difficult,
+                game.move_budget(), list(game.history.keys),
+            )
+        except BrokenProcessPool as error:
+            if self.executor is executor:  # A worker died; later moves get a fresh pool
+                self.executor = self.start_pool()
+                executor.shutdown(wait=False)
+            raise RequestError(f"CPU move failed: {error}") from error
+        except Exception as error:
+            raise RequestError(f"CPU move failed: {error!r}") from error
+        if game.clock is not None:
+            game.clock = max(0.0, game.clock - think_time)
+        game.play(move)  # An empty move when the CPU has no piece that can move and passes
+        return {**game.state(), "cpu_move": move, "think_time": round(think_time, 6)}
+
+    async def serve(self, host: str, port: int) -> None:
+        """Accepts connections until cancelled."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Host Crab Puzzle games over TCP (line-delimited JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=None, help="CPU worker processes (default: one per CPU)")
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="CPU moves that may wait for a worker before requests are refused (default: workers)")
+    args = parser.parse_args()
+
+    game_server = GameServer(args.workers, args.max_pending)
+    try:
+        asyncio.run(game_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game_server.close()
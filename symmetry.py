@@ -0,0 +1,113 @@
+"""Board symmetries and canonical position keys.
+
+The rules are unchanged by the 8 symmetries of the square (rotations and reflections) and by
+swapping the colours together with the side to move. `canonical_key` maps all up to 16
+equivalent (position, side to move) pairs to one key. Moves found in the canonical frame are
+mapped back with `from_canonical_move`.
+"""
+from typing import List
+from bitboard import DIRECTIONS, NUM_SQUARES, Position, encode_move, from_table
+from utils import TABLE_SIZE
+
+LAST = TABLE_SIZE - 1
+
+# Each symmetry maps (row, col) to a new (row, col); index 0 is the identity
+SYMMETRIES: tuple = (
+    lambda row, col: (row, col),                  # identity
+    lambda row, col: (col, LAST - row),           # rotate 90° clockwise
+    lambda row, col: (LAST - row, LAST - col),    # rotate 180°
+    lambda row, col: (LAST - col, row),           # rotate 270° clockwise
+    lambda row, col: (row, LAST - col),           # mirror left-right
+    lambda row, col: (LAST - row, col),           # mirror top-bottom
+    lambda row, col: (col, row),                  # main diagonal
+    lambda row, col: (LAST - col, LAST - row),    # anti-diagonal
+)
+
+
+def _map_square(symmetry, square: int) -> int:
+    """Returns the square that `square` becomes under `symmetry`."""
+    row, col = symmetry(*divmod(square, TABLE_SIZE))
+    return row * TABLE_SIZE + col
+
+
+SQUARE_MAPS: tuple = tuple(tuple(_map_square(symmetry, square) for square in range(NUM_SQUARES))
+                           for symmetry in SYMMETRIES)
+
+
+def _map_direction(symmetry, direction: tuple[int, int]) -> int:
+    """Returns the index of the direction that `direction` becomes under `symmetry`."""
+    origin, target = symmetry(0, 0), symmetry(*direction)
+    return DIRECTIONS.index((target[0] - origin[0], target[1] - origin[1]))
+
+
+DIRECTION_MAPS: tuple = tuple(tuple(_map_direction(symmetry, direction) for direction in DIRECTIONS)
+                              for symmetry in SYMMETRIES)
+
+INVERSES: tuple = tuple(
+    next(other for other in range(len(SYMMETRIES))
+         if all(SQUARE_MAPS[other][SQUARE_MAPS[index][square]] == square for square in range(NUM_SQUARES)))
+    for index in range(len(SYMMETRIES))
+)
+
+# Byte lookup tables: _BYTE_MAPS[symmetry][chunk][byte] is the image of `byte << (8 * chunk)`
+_CHUNKS = (NUM_SQUARES + 7) // 8
+_BYTE_MAPS: tuple = tuple(
+    tuple(
+        tuple(sum(1 << square_map[8 * chunk + bit] for bit in range(8)
+                  if value >> bit & 1 and 8 * chunk + bit < NUM_SQUARES)
+              for value in range(256))
+        for chunk in range(_CHUNKS)
+    )
+    for square_map in SQUARE_MAPS
+)
+
+
+def transform_board(board: int, symmetry: int) -> int:
+    """Applies a symmetry to a single player's bitboard."""
+    result = 0
+    for chunk_map in _BYTE_MAPS[symmetry]:
+        result |= chunk_map[board & 0xFF]
+        board >>= 8
+    return result
+
+
+def transform_move(move: int, symmetry: int) -> int:
+    """Applies a symmetry to a move code."""
+    return encode_move(SQUARE_MAPS[symmetry][move >> 2], DIRECTION_MAPS[symmetry][move & 3])
+
+
+def canonical_key(position: Position, side_to_move: int) -> tuple[int, int]:
+    """Returns (key, symmetry) for a position with `side_to_move` to play.
+
+    The key packs the mover's pieces above the opponent's (`mover << 36 | opponent`), so it
+    already ignores colours; `symmetry` is the transform that maps the actual board onto the
+    canonical one. Equivalent positions get the same key.
+    """
+    mover, other = position.boards[side_to_move], position.boards[3 - side_to_move]
+    best_key, best_symmetry = None, 0
+    for symmetry in range(len(SYMMETRIES)):
+        key = transform_board(mover, symmetry) << NUM_SQUARES | transform_board(other, symmetry)
+        if best_key is None or key < best_key:
+            best_key, best_symmetry = key, symmetry
+    return best_key, best_symmetry
+
+
+def canonical_key_for_table(table: List[List[int]], side_to_move: int) -> tuple[int, int]:
+    """`canonical_key` for a list-of-lists game table."""
+    return canonical_key(from_table(table), side_to_move)
+
+
+def to_canonical_move(move: int, symmetry: int) -> int:
+    """Maps a move from the actual board into the canonical frame."""
+    return transform_move(move, symmetry)
+
+
+def from_canonical_move(move: int, symmetry: int) -> int:
+    """Maps a move found in the canonical frame back onto the actual board."""
+    return transform_move(move, INVERSES[symmetry])
+
+
+def position_from_key(key: int, side_to_move: int) -> Position:
+    """Rebuilds the canonical position of `key` with `side_to_move`'s pieces as the mover's."""
+    mover, other = key >> NUM_SQUARES, key & ((1 << NUM_SQUARES) - 1)
+    return Position(mover, other) if side_to_move == 1 else Position(other, mover)
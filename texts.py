@@ -31,6 +31,7 @@ RULES = f"""
 5. Game Flow:
     - Players take turns moving one dot at a time.
     - If no player aligns four dots, the game continues until a winner emerges.
+    - If the same position occurs three times with the same player to move, the game is a draw.
 
 6. Tips:
     - Block your opponent’s moves while setting up your own alignment!
@@ -47,4 +48,5 @@ DIFFICULT = f"""
 Difficult:
 1. Normal
 2. Hard
+3. MCTS
 Choose an option: """
\ No newline at end of file
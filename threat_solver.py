@@ -0,0 +1,138 @@
+"""Threat-space solver for forced wins and losses.
+
+A depth-limited AND/OR search that looks much deeper than minimax_hard by narrowing the
+attacker's moves. At OR nodes the attacker only plays moves that win at once, or that create
+or block a three-of-four window (three pieces and an empty square). At AND nodes the defender
+tries every move. A proven result is therefore a real forced win, even though some wins are
+missed.
+"""
+from typing import Optional
+from bitboard import Position
+
+WIN, LOSS, UNKNOWN = 1, -1, 0
+
+DEFAULT_MAX_PLIES = 7
+DEFAULT_MAX_NODES = 20000
+
+
+class _BudgetExhausted(Exception):
+    """Raised internally when the solver runs out of nodes."""
+
+
+class ThreatSolver:
+    """Proves win-in-N / loss-in-N with a node budget; results are memoised per (position, plies)."""
+
+    def __init__(self, max_nodes: int = DEFAULT_MAX_NODES) -> None:
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.memo: dict[tuple[int, int, int, int], bool] = {}  # (hash, side to move, attacker, plies)
+
+    def _tick(self) -> None:
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise _BudgetExhausted
+
+    def _threat_moves(self, position: Position, attacker: int) -> list[int]:
+        """Attacker moves that create a three of their own or break up one of the defender's."""
+        defender = 3 - attacker
+        _, own_threes, _ = position.patterns(attacker)
+        _, their_threes, _ = position.patterns(defender)
+        candidates = []
+        for move in position.moves(attacker):
+            undo = position.make_move(move, attacker)
+            if position.patterns(attacker)[1] > own_threes or position.patterns(defender)[1] < their_threes:
+                candidates.append(move)
+            position.unmake_move(undo, attacker)
+        return candidates
+
+    def attacker_wins(self, position: Position, attacker: int, plies: int) -> Optional[int]:
+        """OR node: returns an attacker move that forces a win within `plies` plies, or None."""
+        self._tick()
+        moves, has_line = position.moves(attacker), position.rules.has_line
+        for move in moves:
+            undo = position.make_move(move, attacker)
+            won = has_line(position.boards[attacker])
+            position.unmake_move(undo, attacker)
+            if won:
+                return move
+        if plies < 3:
+            return None
+
+        key = (position.hash, attacker, attacker, plies)
+        if self.memo.get(key) is False:
+            return None
+        for move in self._threat_moves(position, attacker):
+            undo = position.make_move(move, attacker)
+            proven = self.defender_loses(position, attacker, plies - 1)
+            position.unmake_move(undo, attacker)
+            if proven:
+                self.memo[key] = True
+                return move
+        self.memo[key] = False
+        return None
+
+    def defender_loses(self, position: Position, attacker: int, plies: int) -> bool:
+        """AND node: True if every defender move still loses within `plies` plies."""
+        self._tick()
+        defender = 3 - attacker
+        key = (position.hash, defender, attacker, plies)
+        if key in self.memo:
+            return self.memo[key]
+
+        moves, has_line = position.moves(defender), position.rules.has_line
+        proven = bool(moves) and plies >= 2  # A defender without moves is not proven lost
+        for move in moves if proven else ():
+            undo = position.make_move(move, defender)
+            escaped = has_line(position.boards[defender]) or self.attacker_wins(position, attacker, plies - 1) is None
+            position.unmake_move(undo, defender)
+            if escaped:
+                proven = False
+                break
+        self.memo[key] = proven
+        return proven
+
+    def solve(self, position: Position, player: int, max_plies: int = DEFAULT_MAX_PLIES) -> tuple[int, Optional[int], int]:
+        """Looks for a forced result for `player` to move.
+
+        Returns (WIN, winning move, plies), (LOSS, longest-resisting move, plies) or
+        (UNKNOWN, None, 0) when nothing is proven within `max_plies` or the node budget.
+        `position` itself is never modified.
+        """
+        position = position.copy()  # Running out of nodes abandons the search mid-move
+        opponent = 3 - player
+        try:
+            for plies in range(1, max_plies + 1, 2):
+                move = self.attacker_wins(position, player, plies)
+                if move is not None:
+                    return WIN, move, plies
+
+            for plies in range(2, max_plies, 2):
+                if self.defender_loses(position, opponent, plies):
+                    break
+            else:
+                return UNKNOWN, None, 0
+        except _BudgetExhausted:
+            return UNKNOWN, None, 0
+
+        try:
+            return LOSS, self._longest_defence(position, player, plies), plies
+        except _BudgetExhausted:  # Lost, but no resisting move was chosen: leave it to the regular search
+            return UNKNOWN, None, 0
+
+    def _longest_defence(self, position: Position, player: int, plies: int) -> Optional[int]:
+        """Among moves of a lost position, picks the one whose refutation takes the most plies."""
+        opponent, best_move, best_length = 3 - player, None, -1
+        for move in position.moves(player):
+            undo = position.make_move(move, player)
+            length = next((length for length in range(1, plies, 2)
+                           if self.attacker_wins(position, opponent, length) is not None), plies)
+            position.unmake_move(undo, player)
+            if length > best_length:
+                best_move, best_length = move, length
+        return best_move
+
+
+def solve(position: Position, player: int, max_plies: int = DEFAULT_MAX_PLIES,
+          max_nodes: int = DEFAULT_MAX_NODES) -> tuple[int, Optional[int], int]:
+    """Runs a fresh ThreatSolver on `position`; see ThreatSolver.solve."""
+    return ThreatSolver(max_nodes).solve(position, player, max_plies)
@@ -0,0 +1,63 @@
+from typing import Optional
+
+# Bound types stored with each entry
+EXACT: int = 0  # The score is the exact minimax value
+LOWER: int = 1  # The search failed high: the real value is at least the score
+UPPER: int = 2  # The search failed low: the real value is at most the score
+
+DEFAULT_SIZE: int = 1 << 18  # Number of entries (two per bucket)
+
+
+class TranspositionTable:
+    """Fixed-size table of search results keyed by Zobrist hash.
+
+    Each bucket holds two entries: a depth-preferred slot, replaced only by searches at least
+    as deep or by any search once its entry is from an older generation, and an always-replace
+    slot that takes everything else. Memory therefore never grows past `size` entries.
+    Entries are `(key, depth, score, bound, move, generation)` tuples; call `age` between the
+    searches of a game so that deep but stale entries give way to new ones.
+    """
+
+    __slots__ = ("entries", "mask", "generation")
+
+    def __init__(self, size: int = DEFAULT_SIZE) -> None:
+        buckets = 1
+        while buckets * 2 <= max(size // 2, 1):
+            buckets *= 2
+        self.mask = buckets - 1
+        self.entries: list[Optional[tuple]] = [None] * (buckets * 2)
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return sum(1 for entry in self.entries if entry is not None)
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        self.entries = [None] * len(self.entries)
+
+    def age(self) -> None:
+        """Starts a new generation: existing entries stay readable but lose their replacement priority."""
+        self.generation += 1
+
+    def probe(self, key: int) -> Optional[tuple]:
+        """Returns the entry stored for `key`, or None."""
+        index = (key & self.mask) << 1
+        entry = self.entries[index]
+        if entry is not None and entry[0] == key:
+            return entry
+        entry = self.entries[index + 1]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: Optional[int]) -> None:
+        """Stores a search result, keeping the deeper current entry of each bucket in its first slot."""
+        index = (key & self.mask) << 1
+        entry = (key, depth, score, bound, move, self.generation)
+        preferred = self.entries[index]
+        if preferred is None or preferred[0] == key or depth >= preferred[1] or preferred[5] != self.generation:
+            if preferred is not None and preferred[0] != key:
+                self.entries[index + 1] = preferred  # Demote the shallower entry
+            self.entries[index] = entry
+        else:
+            self.entries[index + 1] = entry
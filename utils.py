@@ -1,11 +1,13 @@
 import os
 import random
+import sys
 import time
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from texts import LOGO, RULES
 
 # Constants
 TABLE_SIZE: int = 6  # The size of the table (6x6)
+LINE_LENGTH: int = 4  # Pieces in a row that win the game
 GREEN_SQUARE: str = "🟩"  # Represents Player 1
 RED_SQUARE: str = "🟥"    # Represents Player 2
 WHITE_SQUARE: str = "🟨"  # Represents an empty square
@@ -14,24 +16,35 @@ GREEN_CIRCLE: str = "🟢"
 RED_CIRCLE: str = "🔴"
 WHITE_CIRCLE: str = "🟡"
 
+COLUMN_HEADER: str = "   A B C D E F"
+FRAME_DELAY: float = 0.15  # Seconds between animation frames
+CLEAR_SCREEN: str = "\x1b[2J\x1b[H"  # ANSI: erase the screen and move the cursor home
+
+if os.name == 'nt':
+    os.system('')  # Turns on ANSI escape handling in the Windows console
+
 
 def show_logo() -> None:
     """Displays the game logo."""
     print(LOGO)
 
 
-def choose_first_player() -> int:
+def choose_first_player(rng: Optional[random.Random] = None) -> int:
     """Randomly chooses the first player (1 or 2).
 
+    Args:
+        rng: Optional random generator, for reproducible games. Defaults to the `random` module.
+
     Returns:
         int: The player number (1 for Player 1, 2 for Player 2).
     """
-    return random.choice((1, 2))
+    return (rng or random).choice((1, 2))
 
 
 def clear_screen() -> None:
     """Clears the terminal screen."""
-    os.system('cls' if os.name == 'nt' else 'clear')
+    sys.stdout.write(CLEAR_SCREEN)
+    sys.stdout.flush()
 
 
 def separator() -> None:
@@ -60,49 +73,53 @@ def translate_direction(direction: Dict[str, int]) -> str:
     return directions.get((direction.get('vertical', 0), direction.get('horizontal', 0)), "Invalid direction")
 
 
-def create_initial_table() -> List[List[int]]:
+def initial_layout(size: int = TABLE_SIZE) -> list[tuple[int, int, int]]:
+    """Returns the (row, col, player) starting squares: corners, edge middles, colors alternating.
+
+    On the 6x6 table these are the game's predefined positions.
+    """
+    if size < 4 or size % 2:
+        raise ValueError("the starting layout needs an even board size of at least 4")
+    last, middle = size - 1, size // 2
+    return [(0, 0, 1), (0, middle - 1, 2), (0, middle, 1), (0, last, 2),
+            (middle - 1, 0, 2), (middle - 1, last, 1), (middle, 0, 1), (middle, last, 2),
+            (last, 0, 2), (last, middle - 1, 1), (last, middle, 2), (last, last, 1)]
+
+def create_initial_table(size: int = TABLE_SIZE) -> List[List[int]]:
     """Creates the initial game table with predefined positions for players."""
-    table = [[0 for _ in range(TABLE_SIZE)] for _ in range(TABLE_SIZE)]
-    positions = [(0, 0, 1), (0, 2, 2), (0, 3, 1), (0, 5, 2),
-                 (2, 0, 2), (2, 5, 1), (3, 0, 1), (3, 5, 2),
-                 (5, 0, 2), (5, 2, 1), (5, 3, 2), (5, 5, 1)]
-    for row, col, player in positions:
+    table = [[0 for _ in range(size)] for _ in range(size)]
+    for row, col, player in initial_layout(size):
         table[row][col] = player
     return table
 
+def format_table(table: List[List[int]], highlight_pos: Optional[tuple[int, int]] = None) -> str:
+    """Returns the text of the game table, with the piece at `highlight_pos` highlighted."""
+    lines = [COLUMN_HEADER]
+    for row in range(TABLE_SIZE):
+        lines.append(f"{row + 1} " + "".join(draw_square(table[row][col], highlight=(row, col) == highlight_pos)
+                                             for col in range(TABLE_SIZE)))
+    return "\n".join(lines)
+
 def draw_table(table: List[List[int]]) -> None:
     """Displays the current state of the game table."""
-    print("   A B C D E F")
-    for row in range(TABLE_SIZE):
-        print(row + 1, end=" ")
-        for col in range(TABLE_SIZE):
-            print(draw_square(table[row][col]), end="")
-        print("")
+    print(format_table(table))
     separator()
 
 def draw_table_with_highlight(table: List[List[int]], highlight_pos: tuple[int, int] = None) -> None:
     """Displays the current state of the game table with optional highlight."""
-    print("   A B C D E F")
-    for row in range(TABLE_SIZE):
-        print(row + 1, end=" ")
-        for col in range(TABLE_SIZE):
-            if highlight_pos and (row, col) == highlight_pos:
-                # Highlight the current piece with a different color
-                print(draw_square(table[row][col], highlight=True), end="")
-            else:
-                print(draw_square(table[row][col]), end="")
-        print("")
+    print(format_table(table, highlight_pos))
     separator()
 
 def get_available_moves(table: list[list[int]], row: int, col: int) -> list[dict[str, int]]:
     """Calculates all available moves for a piece at the given position."""
     directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    size = len(table)
     
     return [
         {'vertical': dr, 'horizontal': dc}
         for dr, dc in directions
-        if 0 <= (new_row := row + dr) < TABLE_SIZE
-        and 0 <= (new_col := col + dc) < TABLE_SIZE
+        if 0 <= (new_row := row + dr) < size
+        and 0 <= (new_col := col + dc) < size
         and table[new_row][new_col] == 0
     ]
 
@@ -116,28 +133,56 @@ def get_available_squares(table: list[list[int]], player: int) -> list[dict]:
             "square_position": {"row": row, "col": col},
             "available_moves": available_moves
         }
-        for row in range(TABLE_SIZE)
-        for col in range(TABLE_SIZE)
+        for row in range(len(table))
+        for col in range(len(table))
         if table[row][col] == player and (available_moves := get_available_moves(table, row, col))
     ]
 
-def move_piece(table: list[list[int]], piece_position: dict[str, int], move_direction: dict[str, int], player: int) -> list[list[int]]:
-    """Moves a piece in the specified direction until it hits an obstacle or the board limit."""
+def make_move(table: list[list[int]], piece_position: dict[str, int], move_direction: dict[str, int],
+              player: int) -> tuple[tuple[int, int], tuple[int, int]]:
+    """Slides a piece in place and returns the ((row, col), (new_row, new_col)) undo record."""
     row, col = piece_position['row'], piece_position['col']
+    new_row, new_col = row, col
+    size = len(table)
     
-    while True:
-        new_row, new_col = row + move_direction['vertical'], col + move_direction['horizontal']
-        if 0 <= new_row < TABLE_SIZE and 0 <= new_col < TABLE_SIZE and table[new_row][new_col] == 0:
-            table[row][col], table[new_row][new_col] = 0, player
-            row, col = new_row, new_col
-        else:
-            break
+    while (0 <= new_row + move_direction['vertical'] < size
+           and 0 <= new_col + move_direction['horizontal'] < size
+           and table[new_row + move_direction['vertical']][new_col + move_direction['horizontal']] == 0):
+        new_row, new_col = new_row + move_direction['vertical'], new_col + move_direction['horizontal']
     
+    table[row][col], table[new_row][new_col] = 0, player
+    return (row, col), (new_row, new_col)
+
+def unmake_move(table: list[list[int]], undo: tuple[tuple[int, int], tuple[int, int]]) -> None:
+    """Takes back a move using the undo record returned by make_move."""
+    (row, col), (new_row, new_col) = undo
+    if (row, col) == (new_row, new_col):  # The piece did not travel
+        return
+    table[row][col], table[new_row][new_col] = table[new_row][new_col], 0
+
+def move_piece(table: list[list[int]], piece_position: dict[str, int], move_direction: dict[str, int], player: int) -> list[list[int]]:
+    """Moves a piece in the specified direction until it hits an obstacle or the board limit."""
+    make_move(table, piece_position, move_direction, player)
     return table
 
 def animate_move_piece(table: list[list[int]], piece_position: dict[str, int], 
-                      move_direction: dict[str, int], player: int) -> list[list[int]]:
-    """Moves a piece with animation, showing each step of movement."""
+                      move_direction: dict[str, int], player: int, frame_delay: float = FRAME_DELAY,
+                      render: Optional[Callable[[list[list[int]]], None]] = None) -> list[list[int]]:
+    """Moves a piece with animation, showing each step of movement.
+
+    Each frame is shown with `render` (by default the screen is cleared and the table drawn)
+    and held for `frame_delay` seconds. With a zero delay only the final position is drawn.
+    """
+    if render is None:
+        def render(frame: list[list[int]]) -> None:
+            clear_screen()
+            draw_table(frame)
+
+    if frame_delay <= 0:
+        make_move(table, piece_position, move_direction, player)
+        render(table)
+        return table
+
     row, col = piece_position['row'], piece_position['col']
     original_table = [row[:] for row in table]  # Create a copy of the original table
     
@@ -147,8 +192,8 @@ def animate_move_piece(table: list[list[int]], piece_position: dict[str, int],
     while True:
         new_row = current_row + move_direction['vertical']
         new_col = current_col + move_direction['horizontal']
-        if (0 <= new_row < TABLE_SIZE and 
-            0 <= new_col < TABLE_SIZE and 
+        if (0 <= new_row < len(table) and 
+            0 <= new_col < len(table) and 
             original_table[new_row][new_col] == 0):
             path.append((new_row, new_col))
             current_row, current_col = new_row, new_col
@@ -162,25 +207,24 @@ def animate_move_piece(table: list[list[int]], piece_position: dict[str, int],
         # Set the new position
         table[step_row][step_col] = player
         
-        # Clear screen and redraw
-        clear_screen()
-        draw_table(table)
+        render(table)
         
         # Add a small delay for smooth animation
-        time.sleep(0.15)
+        time.sleep(frame_delay)
         
         # Update current position
         row, col = step_row, step_col
     
     return table
 
-def check_winner(table: List[List[int]]) -> int:
-    """Checks the game table for a winner."""
+def check_winner(table: List[List[int]], line_length: int = LINE_LENGTH) -> int:
+    """Checks the game table for a winner: `line_length` pieces in a row or column."""
     # Check rows and columns
-    for i in range(TABLE_SIZE):
-        for j in range(TABLE_SIZE - 3):
-            if table[i][j] != 0 and all(table[i][j] == table[i][j + k] for k in range(4)):
+    size = len(table)
+    for i in range(size):
+        for j in range(size - line_length + 1):
+            if table[i][j] != 0 and all(table[i][j] == table[i][j + k] for k in range(line_length)):
                 return table[i][j]
-            if table[j][i] != 0 and all(table[j][i] == table[j + k][i] for k in range(4)):
+            if table[j][i] != 0 and all(table[j][i] == table[j + k][i] for k in range(line_length)):
                 return table[j][i]
     return 0
\ No newline at end of file